@@ -0,0 +1,453 @@
+"""Banc de mesure des générateurs PDF, du chargement du référentiel et de la génération IA.
+
+Usage (depuis la racine du projet) :
+    python benchmarks/bench.py                      # toutes les échelles
+    python benchmarks/bench.py --rapide             # petites échelles seulement
+    python benchmarks/bench.py --reference ancien.json --sortie nouveau.json
+
+Tout est fait sur des référentiels et des fiches synthétiques (backend IA factice, sans réseau), dans un
+dossier temporaire (PEDAGO_DATA_DIR / PEDAGO_DB_PATH) : ni les CSV ni pedago.db du projet ne sont touchés.
+Chaque cas donne le temps (médiane et minimum), le pic mémoire Python (tracemalloc) et la taille produite.
+Les seuils de benchmarks/seuils.json et, si fournie, la comparaison à une mesure de référence
+décident du code de retour (1 si un cas dépasse).
+"""
+import argparse
+import atexit
+import concurrent.futures
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- 1. DOSSIER DE TRAVAIL (avant tout import du paquet pedago) ---
+WORK_DIR = tempfile.mkdtemp(prefix="pedago_bench_")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+os.environ["PEDAGO_DATA_DIR"] = WORK_DIR
+os.environ["PEDAGO_DB_PATH"] = os.path.join(WORK_DIR, "pedago.db")
+os.environ["PEDAGO_CACHE_DIR"] = os.path.join(WORK_DIR, "cache")
+sys.path.insert(0, ROOT_PATH)
+# Hors de "streamlit run", st.cache_resource prévient qu'il n'y a pas de session : sans intérêt ici
+logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+import pandas as pd
+from fpdf import FPDF
+
+from pedago import bilans, config, db, file_ia, ia, quiz, referentiel, rendu
+from pedago.annexes import merge_annex
+from pedago.pdf_bilan import create_bilan_pdf
+from pedago.pdf_evaluation import create_eval_pdf
+from pedago.pdf_fiche import create_pdf
+from pedago.pdf_sequence import create_sequence_pdf
+
+ECHELLES = {"skills": (100, 1000, 10000), "blocs": (1, 20, 200), "pages": (1, 50, 500), "mots": (100, 1000, 10000), "sessions": (10, 100, 1000), "copies": (1, 35, 1000), "resultats": (10000, 100000)}
+ECHELLES_RAPIDES = {"skills": (100, 1000), "blocs": (1, 20), "pages": (1, 50), "mots": (100, 1000), "sessions": (10, 100), "copies": (1, 35), "resultats": (10000,)}
+
+# --- 2. DONNÉES SYNTHÉTIQUES ---
+SKILLS_PAR_LABEL = 8
+LABELS_PAR_COMPETENCE = 3
+
+def ecrire_referentiel(dossier, n_skills):
+    """Trois CSV au format du projet, n_skills savoir-faire par domaine (accents, apostrophes typographiques,
+    tabulations dans la compétence et virgules entre guillemets, comme dans les vrais fichiers)."""
+    os.makedirs(dossier, exist_ok=True)
+    for domaine, nom in config.CSV_FILES.items():
+        with open(os.path.join(dossier, nom), "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(referentiel.REQUIRED_COLUMNS)
+            for i in range(n_skills):
+                n_label = i // SKILLS_PAR_LABEL
+                n_comp = n_label // LABELS_PAR_COMPETENCE
+                writer.writerow([
+                    f"C{n_comp}\tCompétence {domaine} n°{n_comp} : s’approprier, analyser et réaliser",
+                    f"SF{i}: Élaborer la procédure n°{i} (débit, format, contraintes)",
+                    f"Focus : activité {n_label} – mise en œuvre, réglages, contrôle",
+                    f"Pré-requis {i % 40}, Notion {i % 7}",
+                    f"Matériel {i % 60}",
+                    f"Matière {i % 12}",
+                ])
+
+def fiche_synthetique(index, n_blocs):
+    """info, blocs et déroulé d'une fiche de n_blocs blocs, tirés de l'index d'un domaine"""
+    labels = list(index.labels.items())
+    blocks = []
+    for i in range(n_blocs):
+        label, act = labels[i % len(labels)]
+        blocks.append({
+            "id": i, "domain": index.domaine, "competence": act.official_name, "label": label,
+            "skills": list(act.skills[:5]), "all_skills": list(act.skills),
+            "prerequis": ", ".join(index.prerequis[i % 5:i % 5 + 2]),
+            "materiel": ", ".join(index.materiel[i % 7:i % 7 + 3]),
+            "liens": ", ".join(index.liens[i % 3:i % 3 + 1]),
+        })
+    texte = "Consignes détaillées : mise en place du plateau, réglages, essais “à blanc” puis tournage. " * 3
+    info = {
+        "title": "Séance de référence – captation multicam", "seq": "3", "sea": "2", "doc_id": "SEQ3SE2",
+        "date": "2024-09-12", "classe": "TIEE 1", "duration": "4h", "goal": texte, "desc": texte,
+        "num": "3", "dates": "Sept - Oct", "obj": texte, "prob": texte, "type_eval": "Evaluation Formative",
+    }
+    content = [{"title": f"Phase {i}", "duration": "15'", "desc": texte} for i in range(max(3, n_blocs // 4))]
+    steps = [{"type": "Evaluation" if i % 5 == 4 else "Séance", "num": str(i + 1), "title": f"Étape {i + 1}",
+              "duration": "4h", "desc": texte} for i in range(max(3, n_blocs // 2))]
+    return info, blocks, content, steps
+
+def resultats_synthetiques(n_lignes):
+    statuts = [("🟢 Maîtrisé", 3), ("🟠 En cours", 2), ("🔴 Critique", 1)]
+    return pd.DataFrame([{
+        "Poste": f"Poste n°{i}", "Score": i % 7, "Max": 6, "Pourcentage": 50.0,
+        "Statut": statuts[i % 3][0], "Priorite": statuts[i % 3][1],
+        "Conseil": "Relis les fiches techniques sur les points experts avant la prochaine séance. " * (1 + i % 3),
+    } for i in range(n_lignes)])
+
+def resultats_quiz_synthetiques(debut, fin):
+    """Lignes debut..fin de resultats_quiz : cinq classes, trois postes, une copie par minute depuis 2023"""
+    i = pd.RangeIndex(debut, fin)
+    return pd.DataFrame({
+        "date_heure": (pd.Timestamp("2023-09-01") + pd.to_timedelta(i, unit="min")).strftime("%Y-%m-%d %H:%M:%S"),
+        "nom": "Eleve" + (i // 3 % 5000).astype(str), "prenom": "Test", "classe": pd.Series(["TIEE", "Montage", "Gestion", "Image", "Son"]).take(i // 3 % 5).to_numpy(),
+        "Poste": pd.Series(["Chef Équipement Plateau Vert", "Truquiste Plateau Bleu", "Sondier Plateau"]).take(i % 3).to_numpy(),
+        "Score": i % 7, "Max": 6, "Pourcentage": (i % 7) / 6 * 100, "Statut": "🟠 En cours",
+    })
+
+def annexe_synthetique(n_pages):
+    pdf = FPDF()
+    pdf.set_font("Arial", "", 12)
+    for i in range(n_pages):
+        pdf.add_page()
+        pdf.cell(0, 10, f"Annexe - page {i + 1}", 0, 1)
+        pdf.multi_cell(0, 6, "Schema de cablage, synoptique et liste du materiel. " * 20)
+    return pdf.output(dest="S").encode("latin-1")
+
+# --- 3. MESURE ---
+def mesurer(fonction, repetitions, preparer=None):
+    """Temps (médiane, min) sur plusieurs répétitions, puis une exécution sous tracemalloc pour le pic mémoire.
+
+    preparer(), si fournie, est appelée avant chaque exécution, hors chronométrage.
+    """
+    temps = []
+    resultat = None
+    for _ in range(repetitions):
+        if preparer:
+            preparer()
+        debut = time.perf_counter()
+        resultat = fonction()
+        temps.append(time.perf_counter() - debut)
+    if preparer:
+        preparer()
+    tracemalloc.start()
+    try:
+        fonction()
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "temps_s": round(statistics.median(temps), 6), "temps_min_s": round(min(temps), 6),
+        "memoire_mo": round(pic / 1e6, 3), "repetitions": repetitions,
+    }, resultat
+
+def taille(resultat):
+    if isinstance(resultat, (bytes, bytearray)):
+        return {"taille_octets": len(resultat)}
+    if hasattr(resultat, "values"):
+        # Index d'un domaine : nombre d'activités et de savoir-faire
+        return {"activites": len(resultat), "savoir_faire": sum(len(a.skills) for a in resultat.values())}
+    return {}
+
+def _pointer_vers(dossier):
+    """Redirige le paquet vers un autre référentiel / une autre base (lus à chaque appel)"""
+    config.DATA_DIR = dossier
+    config.DB_FILE_PATH = os.path.join(dossier, "pedago.db")
+    config.CACHE_DIR = os.path.join(dossier, "cache")
+
+def _base_neuve():
+    """Supprime la base du dossier courant : le prochain init_db relit les CSV (ou leurs instantanés)"""
+    path = config.DB_FILE_PATH
+    pool = db._pools.pop(path, None)
+    while pool is not None and not pool.empty():
+        pool.get_nowait().close()
+    for cle in [cle for cle in db._schemas_prets if cle[0] == path]:
+        db._schemas_prets.discard(cle)
+    for suffixe in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffixe):
+            os.remove(path + suffixe)
+    referentiel._signature_connue = None
+
+def _depart_a_froid():
+    """Ni base, ni instantané : les CSV sont analysés"""
+    _base_neuve()
+    shutil.rmtree(config.CACHE_DIR, ignore_errors=True)
+
+def _toucher_csv():
+    """Change la date des CSV sans modifier leur contenu (copie, checkout...)"""
+    for domaine in config.CSV_FILES:
+        os.utime(referentiel.find_csv(domaine), ns=(time.time_ns(), time.time_ns()))
+
+# --- 4. CAS MESURÉS ---
+def cas_chargement(echelles, repetitions, garder):
+    dom = next(iter(config.CSV_FILES))
+    for n_skills in echelles["skills"]:
+        dossier = os.path.join(WORK_DIR, f"skills_{n_skills}")
+        ecrire_referentiel(dossier, n_skills)
+        _pointer_vers(dossier)
+        suffixe = f"skills={n_skills}"
+
+        if garder(f"init_db/froid/{suffixe}"):
+            mesure, _ = mesurer(referentiel.init_db, repetitions, preparer=_depart_a_froid)
+            yield f"init_db/froid/{suffixe}", mesure, {"taille_octets": os.path.getsize(config.DB_FILE_PATH)}
+        if garder(f"init_db/instantane/{suffixe}"):
+            referentiel.init_db()
+            mesure, _ = mesurer(referentiel.init_db, repetitions, preparer=_base_neuve)
+            yield f"init_db/instantane/{suffixe}", mesure, {}
+        empreinte = referentiel._comparer(referentiel._signature_disque(), {})[0][dom]
+        if garder(f"charger_csv/analyse/{suffixe}"):
+            mesure, _ = mesurer(lambda: referentiel.charger_csv(dom, empreinte), repetitions,
+                                preparer=lambda: shutil.rmtree(config.CACHE_DIR, ignore_errors=True))
+            yield f"charger_csv/analyse/{suffixe}", mesure, {}
+        if garder(f"charger_csv/instantane/{suffixe}"):
+            referentiel.charger_csv(dom, empreinte)
+            mesure, _ = mesurer(lambda: referentiel.charger_csv(dom, empreinte), repetitions)
+            yield f"charger_csv/instantane/{suffixe}", mesure, {}
+        if garder(f"init_db/csv_touche/{suffixe}"):
+            mesure, _ = mesurer(referentiel.init_db, repetitions, preparer=_toucher_csv)
+            yield f"init_db/csv_touche/{suffixe}", mesure, {}
+        if garder(f"init_db/chaud/{suffixe}"):
+            referentiel.init_db()
+            mesure, _ = mesurer(referentiel.init_db, max(repetitions, 20))
+            yield f"init_db/chaud/{suffixe}", mesure, {}
+
+        get_data = lambda: referentiel.get_data_for_domain(dom)
+        if garder(f"get_data_for_domain/froid/{suffixe}"):
+            mesure, labels = mesurer(get_data, repetitions, preparer=referentiel._charger_index.clear)
+            yield f"get_data_for_domain/froid/{suffixe}", mesure, taille(labels)
+        if garder(f"get_data_for_domain/chaud/{suffixe}"):
+            get_data()
+            mesure, labels = mesurer(get_data, max(repetitions, 20))
+            yield f"get_data_for_domain/chaud/{suffixe}", mesure, taille(labels)
+
+def cas_pdf(echelles, repetitions, garder):
+    index = referentiel.get_domain_index(next(iter(config.CSV_FILES)))
+    for n_blocs in echelles["blocs"]:
+        info, blocks, content, steps = fiche_synthetique(index, n_blocs)
+        suffixe = f"blocs={n_blocs}"
+        for nom, fonction in (
+            ("create_pdf", lambda: create_pdf(info, blocks, content)),
+            ("create_sequence_pdf", lambda: create_sequence_pdf(info, steps, blocks)),
+            ("create_eval_pdf", lambda: create_eval_pdf(info, blocks)),
+            ("create_bilan_pdf", lambda: create_bilan_pdf({"nom": "Durand", "prenom": "Élise", "classe": "TIEE"},
+                                                          resultats_synthetiques(n_blocs))),
+        ):
+            if not garder(f"{nom}/{suffixe}"):
+                continue
+            mesure, pdf_bytes = mesurer(fonction, repetitions)
+            yield f"{nom}/{suffixe}", mesure, taille(pdf_bytes)
+        if garder(f"rendu_en_cache/{suffixe}"):
+            # Rerun sans changement : hash des entrées + lecture du cache de rendu
+            en_cache = lambda: rendu.obtenir(rendu.cle_rendu("fiche", info, blocks, content), lambda: create_pdf(info, blocks, content))
+            en_cache()
+            mesure, pdf_bytes = mesurer(en_cache, max(repetitions, 20))
+            yield f"rendu_en_cache/{suffixe}", mesure, taille(pdf_bytes)
+
+    info, blocks, content, _ = fiche_synthetique(index, 5)
+    fiche = create_pdf(info, blocks, content)
+    for n_pages in echelles["pages"]:
+        if not garder(f"merge_annex/pages={n_pages}"):
+            continue
+        annexe = annexe_synthetique(n_pages)
+        mesure, pdf_bytes = mesurer(lambda: merge_annex(fiche, io.BytesIO(annexe), "Documents pour la seance"), repetitions)
+        yield f"merge_annex/pages={n_pages}", mesure, dict(taille(pdf_bytes), taille_annexe_octets=len(annexe))
+
+def cas_quiz(echelles, repetitions, garder):
+    """Correction du quiz (banque de départ) et bilans d'une classe importée : une copie, une classe, une promotion"""
+    import numpy as np
+    corrige = quiz.corrige(quiz.DOMAINE_INITIAL)
+    rng = np.random.default_rng(0)
+    for n_copies in echelles["copies"]:
+        copies = [{int(qid): int(rng.integers(-1, 4)) for qid in corrige.ids} for _ in range(n_copies)]
+        corriger = lambda: quiz.resultats(corrige, quiz.noter(corrige, quiz.tableau_reponses(corrige, copies)))
+        if garder(f"quiz/correction/copies={n_copies}"):
+            mesure, df = mesurer(corriger, repetitions)
+            yield f"quiz/correction/copies={n_copies}", mesure, {"lignes": len(df)}
+        if garder(f"bilans/classe/copies={n_copies}"):
+            # Import d'une classe : rendu de tous les bilans (cache de rendu vidé) et archive ZIP
+            df = corriger()
+            lot = bilans.par_eleve(df.assign(nom=[f"Eleve{i}" for i in df["copie"]], prenom="Test", classe="TIEE"))
+            def classe():
+                pdfs = bilans.rendre_bilans(lot)
+                return bilans.en_zip([identite for identite, _ in lot], pdfs)
+            mesure, archive = mesurer(classe, repetitions, preparer=rendu.cache.vider)
+            yield f"bilans/classe/copies={n_copies}", mesure, dict(taille(archive), processus=config.BILANS_PROCESSUS)
+        if garder(f"bilans/pool/copies={n_copies}"):
+            # Même lot avec au moins deux processus : le premier import est rendu sur place et lance le pool,
+            # les imports mesurés ensuite passent par le pool prêt (coût du parallèle seul)
+            df = corriger()
+            lot = bilans.par_eleve(df.assign(nom=[f"Eleve{i}" for i in df["copie"]], prenom="Test", classe="TIEE"))
+            processus = config.BILANS_PROCESSUS
+            config.BILANS_PROCESSUS = max(2, processus)
+            try:
+                rendu.cache.vider()
+                bilans.rendre_bilans(lot)
+                concurrent.futures.wait(bilans._prechauffage)
+                mesure, pdfs = mesurer(lambda: bilans.rendre_bilans(lot), repetitions, preparer=rendu.cache.vider)
+                yield f"bilans/pool/copies={n_copies}", mesure, dict(taille(b"".join(pdfs)), processus=config.BILANS_PROCESSUS,
+                                                                      pool=bilans._pool is not None)
+            finally:
+                config.BILANS_PROCESSUS = processus
+                bilans._abandonner_pool()
+
+def cas_resultats(echelles, repetitions, garder):
+    """Zone Professeur sur une table resultats_quiz qui grossit : page filtrée, compte plafonné, exports CSV et XLSX"""
+    from pedago import exports, resultats
+    deja = 0
+    filtres = resultats.FiltresResultats(classe="Image")
+    for n_lignes in echelles["resultats"]:
+        suffixe = f"lignes={n_lignes}"
+        if not any(garder(f"resultats/{cas}/{suffixe}") for cas in ("page", "compte", "export", "xlsx")):
+            continue
+        resultats.save_results_frame(resultats_quiz_synthetiques(deja, n_lignes))
+        deja = n_lignes
+        if garder(f"resultats/page/{suffixe}"):
+            # Dixième page : le curseur rend son coût indépendant de la position
+            curseur = None
+            for _ in range(9):
+                _, curseur = resultats.page_resultats(filtres, curseur)
+            mesure, (lignes, _) = mesurer(lambda: resultats.page_resultats(filtres, curseur), max(repetitions, 20))
+            yield f"resultats/page/{suffixe}", mesure, {"lignes": len(lignes)}
+        if garder(f"resultats/compte/{suffixe}"):
+            mesure, total = mesurer(lambda: resultats.compter_resultats(filtres), max(repetitions, 20))
+            yield f"resultats/compte/{suffixe}", mesure, {"total": total}
+        if garder(f"resultats/export/{suffixe}"):
+            mesure, taille_csv = mesurer(lambda: sum(map(len, resultats.exporter_csv(resultats.FiltresResultats()))), repetitions)
+            yield f"resultats/export/{suffixe}", mesure, {"taille_octets": taille_csv}
+        if garder(f"resultats/xlsx/{suffixe}"):
+            # Classeur write-only : le pic mémoire ne doit pas suivre le nombre de lignes
+            def classeur():
+                with exports.xlsx_resultats(filtres) as lecteur:
+                    return os.fstat(lecteur.fileno()).st_size
+            mesure, taille_xlsx = mesurer(classeur, repetitions)
+            yield f"resultats/xlsx/{suffixe}", mesure, {"taille_octets": taille_xlsx}
+
+def cas_ia(echelles, repetitions, garder):
+    """Chaîne de génération en flux avec le backend factice (sans attente) : coût propre hors réseau"""
+    messages = ia.construire_messages("TIEE", ["Caméra", "Grille vidéo"], ["C1 Installer", "C5 Exploiter"], "Débutant", "2h")
+    for n_mots in echelles["mots"]:
+        nom = f"ia/flux_factice/mots={n_mots}"
+        if not garder(nom):
+            continue
+        backend = ia.Factice(mots=n_mots)
+        generations = []
+        def generer():
+            generation = ia.Generation(backend, messages, max_tokens=2 * n_mots)
+            texte = "".join(generation)
+            generations.append(generation)
+            return texte
+        mesure, texte = mesurer(generer, repetitions)
+        # Dernière exécution chronométrée (la suivante tourne sous tracemalloc)
+        derniere = generations[repetitions - 1]
+        yield nom, mesure, {"morceaux": len(derniere.morceaux), "premier_morceau_s": round(derniere.premier_morceau_s, 6),
+                            "morceaux_par_s": round(len(derniere.morceaux) / max(derniere.duree_s, 1e-9))}
+        # Même demande relue dans ia_cache : ce que coûte un second clic sur « Générer »
+        nom = f"ia/cache/mots={n_mots}"
+        if not garder(nom):
+            continue
+        cle = ia.cle_cache(backend, messages, max_tokens=2 * n_mots)
+        ia.ecrire_cache(cle, backend, ia.TEMPERATURE, texte)
+        mesure, (reponse, _) = mesurer(lambda: ia.lire_cache(cle), repetitions)
+        yield nom, mesure, {"octets": len(reponse.encode("utf-8"))}
+    # Rafale de sessions dans la file commune, chaque demande envoyée par deux sessions : coût de la file
+    # (fusion, réveils, mise en cache) hors réseau et hors limite de débit
+    backend = ia.Factice(mots=100)
+    for n_sessions in echelles["sessions"]:
+        nom = f"ia/file/sessions={n_sessions}"
+        if not garder(nom):
+            continue
+        files = []
+        def rafale():
+            file = file_ia.Planificateur(config.IA_TRAVAILLEURS, 0, 1, 1, n_sessions)
+            demandes = [ia.construire_messages("TIEE", [f"Matériel {i // 2}"], ["C1 Installer"], "Débutant", "1h") for i in range(n_sessions)]
+            abonnements = [file.soumettre(backend, messages) for messages in demandes]
+            files.append(file)
+            return sum(len("".join(abonnement)) for abonnement in abonnements)
+        mesure, _ = mesurer(rafale, repetitions)
+        stats = files[repetitions - 1].stats()
+        yield nom, mesure, {"appels": stats["appels"], "fusions": stats["fusions"]}
+
+# --- 5. SEUILS ET RÉGRESSIONS ---
+def charger_seuils(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def seuils_du_cas(seuils, nom):
+    """Seuils par défaut, surchargés du plus général au plus précis ("init_db/chaud" vaut pour toutes les échelles)"""
+    valeurs = dict(seuils.get("defaut", {}))
+    for prefixe in sorted(seuils.get("cas", {}), key=len):
+        if nom == prefixe or nom.startswith(prefixe + "/"):
+            valeurs.update(seuils["cas"][prefixe])
+    return valeurs
+
+def verifier(nom, mesure, seuils, reference):
+    echecs = []
+    limites = seuils_du_cas(seuils, nom)
+    for cle in ("temps_s", "memoire_mo"):
+        if limites.get(cle) is not None and mesure[cle] > limites[cle]:
+            echecs.append(f"{cle} {mesure[cle]} > seuil {limites[cle]}")
+    ancien = (reference or {}).get(nom)
+    if ancien:
+        tolerance = limites.get("tolerance", seuils.get("tolerance", 1.25))
+        plancher = seuils.get("plancher_temps_s", 0.005)
+        if mesure["temps_s"] > max(ancien["temps_s"] * tolerance, plancher):
+            echecs.append(f"temps_s {mesure['temps_s']} > {tolerance} x référence {ancien['temps_s']}")
+        if mesure["memoire_mo"] > max(ancien["memoire_mo"] * tolerance, 1):
+            echecs.append(f"memoire_mo {mesure['memoire_mo']} > {tolerance} x référence {ancien['memoire_mo']}")
+    return echecs
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rapide", action="store_true", help="petites échelles seulement")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--filtre", default="", help="ne mesurer que les cas dont le nom contient ce texte")
+    parser.add_argument("--seuils", default=os.path.join(BENCH_DIR, "seuils.json"))
+    parser.add_argument("--reference", help="fichier de résultats précédent, pour détecter les régressions")
+    parser.add_argument("--sortie", default=os.path.join(BENCH_DIR, "resultats.json"))
+    args = parser.parse_args(argv)
+
+    echelles = ECHELLES_RAPIDES if args.rapide else ECHELLES
+    seuils = charger_seuils(args.seuils)
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = {cas["nom"]: cas for cas in json.load(f)["cas"]}
+
+    resultats, nb_echecs = [], 0
+    for generateur in (cas_chargement, cas_pdf, cas_quiz, cas_resultats, cas_ia):
+        for nom, mesure, extra in generateur(echelles, args.repetitions, lambda nom: args.filtre in nom):
+            echecs = verifier(nom, mesure, seuils, reference)
+            nb_echecs += bool(echecs)
+            resultats.append(dict(nom=nom, **mesure, **extra, echecs=echecs))
+            etat = "ÉCHEC " + "; ".join(echecs) if echecs else "ok"
+            print(f"{nom:45s} {mesure['temps_s'] * 1000:10.2f} ms {mesure['memoire_mo']:9.2f} Mo  {etat}")
+
+    rapport = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "plateforme": platform.platform(),
+        "versions": {"pandas": pd.__version__, "fpdf": getattr(sys.modules["fpdf"], "__version__", "?"),
+                     "pypdf": getattr(sys.modules.get("pypdf"), "__version__", "?")},
+        "echelles": echelles, "cas": resultats,
+    }
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"\n{len(resultats)} cas, {nb_echecs} au-delà des seuils -> {args.sortie}")
+    return 1 if nb_echecs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+"""Banc de mesure du démarrage : import de streamlit et premier rendu de chaque page.
+
+Usage (depuis la racine du projet) :
+    python benchmarks/startup.py
+    python benchmarks/startup.py --reference ancien.json --sortie nouveau.json
+
+Chaque mesure est faite dans un processus Python neuf, comme un conteneur qui redémarre : import de
+streamlit, premier rendu de la page avec streamlit.testing (AppTest, imports de la page compris), puis
+un second rendu (rerun). On relève aussi le pic mémoire du processus et les dépendances lourdes
+chargées par le premier rendu. La base est une copie de pedago.db, préparée une fois (référentiel à jour)
+dans un dossier temporaire : ni pedago.db ni les CSV du projet ne sont touchés.
+Les seuils "demarrage/..." de benchmarks/seuils.json (temps, mémoire, modules_interdits) et, si fournie,
+la comparaison à une mesure de référence décident du code de retour (1 si une page dépasse).
+"""
+import argparse
+import datetime
+import glob
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Dépendances qu'une page ne doit charger que lorsqu'elle s'en sert
+MODULES_LOURDS = ("pandas", "plotly.express", "fpdf", "pypdf", "openpyxl", "huggingface_hub.inference._client")
+
+# --- 1. DANS LE PROCESSUS MESURÉ ---
+def _preparer():
+    """Base et instantanés du référentiel à jour, comme sur un serveur déjà en service"""
+    sys.path.insert(0, ROOT_PATH)
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    from pedago import referentiel
+    referentiel.init_db()
+
+def _mesurer_page(script):
+    # Comme "streamlit run Accueil.py" : le dossier de l'application est dans le chemin d'import
+    sys.path.insert(0, ROOT_PATH)
+    t0 = time.perf_counter()
+    import streamlit  # noqa: F401
+    from streamlit.testing.v1 import AppTest
+    import_s = time.perf_counter() - t0
+
+    at = AppTest.from_file(os.path.join(ROOT_PATH, script), default_timeout=120)
+    # Jeton factice : le premier rendu n'appelle pas l'API, la page exige seulement un secret
+    at.secrets["HUGGINGFACE_TOKEN"] = "jeton-de-mesure"
+    t1 = time.perf_counter()
+    at.run()
+    premier_rendu_s = time.perf_counter() - t1
+    modules = [m for m in MODULES_LOURDS if m in sys.modules]
+    t2 = time.perf_counter()
+    at.run()
+    rerun_s = time.perf_counter() - t2
+    return {
+        "import_streamlit_s": round(import_s, 6), "premier_rendu_s": round(premier_rendu_s, 6), "rerun_s": round(rerun_s, 6),
+        # ru_maxrss : en Ko sous Linux
+        "memoire_mo": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "modules_lourds": modules, "exceptions": [str(e.value) for e in at.exception],
+    }
+
+# --- 2. PILOTAGE (processus parent) ---
+def lister_pages():
+    return ["Accueil.py"] + sorted(os.path.relpath(p, ROOT_PATH) for p in glob.glob(os.path.join(ROOT_PATH, "pages", "*.py")))
+
+def _lancer(args, env):
+    sortie = subprocess.run([sys.executable, os.path.abspath(__file__), *args], env=env, cwd=ROOT_PATH,
+                            capture_output=True, text=True, check=True)
+    return sortie.stdout
+
+def preparer_base(work_dir):
+    """Copie de pedago.db et cache dans work_dir ; renvoie (chemin de la base préparée, environnement des mesures)"""
+    env = dict(os.environ, PEDAGO_DB_PATH=os.path.join(work_dir, "pedago.db"), PEDAGO_CACHE_DIR=os.path.join(work_dir, "cache"))
+    env.pop("PEDAGO_DATA_DIR", None)
+    source = os.path.join(ROOT_PATH, "pedago.db")
+    if os.path.exists(source):
+        shutil.copy(source, env["PEDAGO_DB_PATH"])
+    _lancer(["--preparer"], env)
+    reference = os.path.join(work_dir, "pedago_prepare.db")
+    shutil.copy(env["PEDAGO_DB_PATH"], reference)
+    return reference, env
+
+def mesurer_demarrage(script, repetitions, base, env):
+    """Médiane sur des processus neufs, chacun sur une copie fraîche de la base préparée"""
+    essais = []
+    for _ in range(repetitions):
+        shutil.copy(base, env["PEDAGO_DB_PATH"])
+        essais.append(json.loads(_lancer(["--page", script], env).splitlines()[-1]))
+    mesure = {cle: statistics.median(e[cle] for e in essais) for cle in ("import_streamlit_s", "premier_rendu_s", "rerun_s", "memoire_mo")}
+    # Le budget porte sur le démarrage complet : import de streamlit + premier rendu
+    mesure["temps_s"] = round(statistics.median(e["import_streamlit_s"] + e["premier_rendu_s"] for e in essais), 6)
+    mesure["temps_min_s"] = round(min(e["import_streamlit_s"] + e["premier_rendu_s"] for e in essais), 6)
+    mesure["modules_lourds"] = sorted(set().union(*(e["modules_lourds"] for e in essais)))
+    mesure["exceptions"] = sorted(set().union(*(e["exceptions"] for e in essais)))
+    mesure["repetitions"] = repetitions
+    return mesure
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--filtre", default="", help="ne mesurer que les pages dont le nom contient ce texte")
+    parser.add_argument("--seuils", default=os.path.join(BENCH_DIR, "seuils.json"))
+    parser.add_argument("--reference", help="fichier de résultats précédent, pour détecter les régressions")
+    parser.add_argument("--sortie", default=os.path.join(BENCH_DIR, "resultats_demarrage.json"))
+    parser.add_argument("--page", help=argparse.SUPPRESS)
+    parser.add_argument("--preparer", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.preparer:
+        _preparer()
+        return 0
+    if args.page:
+        print(json.dumps(_mesurer_page(args.page)))
+        return 0
+
+    # Seuils et comparaison partagés avec bench.py (importé ici seulement : jamais dans un processus mesuré)
+    from bench import charger_seuils, seuils_du_cas, verifier
+    seuils = charger_seuils(args.seuils)
+    reference = None
+    if args.reference:
+        with open(args.reference, encoding="utf-8") as f:
+            reference = {cas["nom"]: cas for cas in json.load(f)["cas"]}
+
+    work_dir = tempfile.mkdtemp(prefix="pedago_startup_")
+    resultats, nb_echecs = [], 0
+    try:
+        base, env = preparer_base(work_dir)
+        for script in lister_pages():
+            nom = f"demarrage/{script}"
+            if args.filtre not in nom:
+                continue
+            mesure = mesurer_demarrage(script, args.repetitions, base, env)
+            echecs = verifier(nom, mesure, seuils, reference)
+            interdits = set(seuils_du_cas(seuils, nom).get("modules_interdits", []))
+            echecs += [f"{m} importé au premier rendu" for m in mesure["modules_lourds"] if m in interdits]
+            echecs += [f"exception : {e}" for e in mesure["exceptions"]]
+            nb_echecs += bool(echecs)
+            resultats.append(dict(nom=nom, **mesure, echecs=echecs))
+            etat = "ÉCHEC " + "; ".join(echecs) if echecs else "ok"
+            print(f"{nom:45s} {mesure['temps_s'] * 1000:8.0f} ms (streamlit {mesure['import_streamlit_s'] * 1000:4.0f} + "
+                  f"rendu {mesure['premier_rendu_s'] * 1000:5.0f}, rerun {mesure['rerun_s'] * 1000:4.0f}) "
+                  f"{mesure['memoire_mo']:6.0f} Mo  {etat}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    rapport = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "plateforme": platform.platform(), "cas": resultats,
+    }
+    with open(args.sortie, "w", encoding="utf-8") as f:
+        json.dump(rapport, f, ensure_ascii=False, indent=2)
+    print(f"\n{len(resultats)} pages, {nb_echecs} au-delà des seuils -> {args.sortie}")
+    return 1 if nb_echecs else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
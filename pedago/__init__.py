@@ -0,0 +1 @@
+"""Briques partagées par les pages Streamlit (référentiel, base de données...)."""
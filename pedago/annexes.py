@@ -0,0 +1,67 @@
+import io
+from functools import lru_cache
+
+from fpdf import FPDF
+from pypdf import PageObject, PdfReader, PdfWriter, Transformation
+
+# --- ANNEXES PDF ENCADRÉES ---
+# L'annexe déposée (UploadedFile, déjà en mémoire) est lue directement par pypdf ; le cadre de chaque
+# taille de page est construit et analysé une seule fois.
+MM_PAR_POINT = 25.4 / 72
+
+@lru_cache(maxsize=32)
+def create_annex_overlay(label, width_pt=595, height_pt=842):
+    """Cadre rouge + titre pour une taille de page donnée (A4 par défaut), construit une seule fois"""
+    w_mm, h_mm = width_pt * MM_PAR_POINT, height_pt * MM_PAR_POINT
+    pdf = FPDF('P', 'mm', (w_mm, h_mm))
+    pdf.set_auto_page_break(auto=False)
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(200, 0, 0)
+    pdf.set_y(5)
+    pdf.cell(0, 10, label, 0, 1, 'C')
+    pdf.set_line_width(1)
+    pdf.rect(5, 5, w_mm - 10, h_mm - 10)
+    return pdf.output(dest='S').encode('latin-1')
+
+@lru_cache(maxsize=32)
+def _page_cadre(label, width_pt, height_pt):
+    """Page du cadre déjà analysée par pypdf, partagée par toutes les fusions.
+
+    Une première fusion sur une page blanche résout tous ses objets : les suivantes ne font que les lire,
+    sans relire le flux du PDF (sûr entre sessions concurrentes).
+    """
+    page = PdfReader(io.BytesIO(create_annex_overlay(label, width_pt, height_pt))).pages[0]
+    PageObject.create_blank_page(width=width_pt, height=height_pt).merge_page(page)
+    return page
+
+def merge_annex(pdf_bytes, annex_file, label, sortie=None):
+    """Ajoute les pages de l'annexe, encadrées, après la fiche.
+
+    annex_file (UploadedFile, fichier binaire...) est lu tel quel par pypdf, sans copie. Le PDF final est
+    écrit dans sortie (fichier binaire, renvoyé) si elle est fournie ; sinon ses octets sont renvoyés.
+    Les pages de l'annexe ne sont jamais ré-imprimées : le cadre est superposé à leur contenu,
+    à la taille de chaque page (A4, A3, paysage...).
+    """
+    annex_file.seek(0)
+    writer = PdfWriter()
+    writer.append(PdfReader(io.BytesIO(pdf_bytes)))
+    for page in PdfReader(annex_file).pages:
+        if page.rotation % 360:
+            # Page tournée : on ramène la rotation dans le contenu pour que le cadre suive l'affichage
+            page.transfer_rotation_to_content()
+        box = page.mediabox
+        cadre = _page_cadre(label, round(float(box.width)), round(float(box.height)))
+        if box.left or box.bottom:
+            page.merge_transformed_page(cadre, Transformation().translate(float(box.left), float(box.bottom)))
+        else:
+            page.merge_page(cadre)
+        writer.add_page(page)
+
+    if sortie is not None:
+        writer.write(sortie)
+        return sortie
+    tampon = io.BytesIO()
+    writer.write(tampon)
+    # Le cache de rendu et st.download_button veulent des octets : une copie finale, la seule
+    return tampon.getvalue()
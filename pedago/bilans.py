@@ -0,0 +1,117 @@
+import io
+import math
+import multiprocessing
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from pedago import config, rendu
+
+# --- BILANS D'UNE CLASSE (rendu en parallèle) ---
+# fpdf est du Python pur : des threads n'iraient pas plus vite, les bilans d'une classe importée sont
+# donc rendus dans un pool de processus. Il est créé une fois par serveur, en "spawn" pour ne pas
+# dupliquer les threads de Streamlit, et reste prêt pour la classe suivante. Un bilan déjà rendu
+# aujourd'hui (même clé que la page Auto-Évaluation) sort du cache de rendu sans repartir dans le pool.
+# Lancer le pool coûte de l'ordre d'une seconde, un bilan une dizaine de ms : le premier import d'une classe
+# est rendu dans le processus du serveur pendant que le pool démarre en arrière-plan, les suivants partent
+# dans le pool déjà prêt (35 copies : 167 ms au lieu de 285 ms, bench bilans/pool). Seul un premier import
+# d'au moins config.BILANS_SEUIL_PARALLELE bilans (un niveau entier) attend le lancement du pool.
+COLONNES_BILAN = ['Poste', 'Score', 'Max', 'Pourcentage', 'Statut', 'Conseil', 'Priorite']
+
+_pool = None
+_pool_lock = threading.Lock()
+# Tâches de préchauffage du dernier pool lancé (une par processus)
+_prechauffage = []
+
+def _prechauffer():
+    # Exécuté dans un processus du pool : fpdf et le gabarit du bilan importés avant le premier vrai rendu
+    import pedago.pdf_bilan  # noqa: F401
+
+def _executeur():
+    global _pool, _prechauffage
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=config.BILANS_PROCESSUS, mp_context=multiprocessing.get_context('spawn'))
+            _prechauffage = [_pool.submit(_prechauffer) for _ in range(config.BILANS_PROCESSUS)]
+        return _pool
+
+def pool_pret():
+    """True si le pool de processus tourne déjà (un import précédent l'a lancé)"""
+    return _pool is not None
+
+def _abandonner_pool():
+    global _pool, _prechauffage
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool, _prechauffage = None, []
+
+def _rendre(identite, df_res):
+    # Exécuté dans un processus du pool : fpdf n'y est importé qu'une fois
+    from pedago.pdf_bilan import create_bilan_pdf
+    return create_bilan_pdf(identite, df_res)
+
+def par_eleve(df_lot):
+    """Tableau « à plat » d'une classe (quiz.corriger_copies) -> [(identite, df_res)] dans l'ordre des copies"""
+    return [({'nom': groupe['nom'].iat[0], 'prenom': groupe['prenom'].iat[0], 'classe': groupe['classe'].iat[0]},
+             groupe[COLONNES_BILAN].reset_index(drop=True))
+            for _, groupe in df_lot.groupby('copie', sort=True)]
+
+def rendre_bilans(bilans):
+    """[(identite, df_res)] -> PDF (octets) de chaque élève, dans le même ordre"""
+    date = rendu.date_du_jour()
+    cles = [rendu.cle_rendu("bilan", identite, df_res, date) for identite, df_res in bilans]
+    pdfs = [rendu.cache.get(cle) for cle in cles]
+    a_rendre = [i for i, pdf in enumerate(pdfs) if pdf is None]
+    rendus = None
+    parallele = len(a_rendre) > 1 and config.BILANS_PROCESSUS > 1
+    if parallele and not pool_pret() and len(a_rendre) < config.BILANS_SEUIL_PARALLELE:
+        # Premier import d'une classe : rendu ici, le pool démarre pendant ce temps pour les imports suivants
+        parallele = False
+        try:
+            _executeur()
+        except OSError as e:
+            print(f"Bilans : pool de processus indisponible ({e}), rendu dans le processus du serveur")
+    if parallele:
+        identites, frames = zip(*(bilans[i] for i in a_rendre))
+        paquet = math.ceil(len(a_rendre) / (2 * config.BILANS_PROCESSUS))
+        try:
+            rendus = list(_executeur().map(_rendre, identites, frames, chunksize=paquet))
+        except (BrokenProcessPool, OSError) as e:
+            # Processus tué ou impossible à lancer : on rend ici, et un pool neuf sera créé la prochaine fois
+            print(f"Bilans : pool de processus indisponible ({e}), rendu dans le processus du serveur")
+            _abandonner_pool()
+    if rendus is None:
+        rendus = [_rendre(*bilans[i]) for i in a_rendre]
+    for i, pdf in zip(a_rendre, rendus):
+        rendu.cache.put(cles[i], pdf)
+        pdfs[i] = pdf
+    return pdfs
+
+def _noms_fichiers(identites):
+    """Bilan_Nom_Prenom.pdf (comme la page), suffixé en cas d'homonymes"""
+    noms, vus = [], {}
+    for identite in identites:
+        base = f"Bilan_{identite['nom']}_{identite['prenom']}".replace('/', '-').replace('\\', '-')
+        vus[base] = vus.get(base, 0) + 1
+        noms.append(f"{base}.pdf" if vus[base] == 1 else f"{base}_{vus[base]}.pdf")
+    return noms
+
+def en_zip(identites, pdfs):
+    sortie = io.BytesIO()
+    with zipfile.ZipFile(sortie, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for nom, pdf in zip(_noms_fichiers(identites), pdfs):
+            archive.writestr(nom, pdf)
+    return sortie.getvalue()
+
+def en_pdf_unique(identites, pdfs):
+    """Tous les bilans à la suite, dans l'ordre du fichier importé, avec un signet par élève"""
+    from pypdf import PdfReader, PdfWriter
+    writer = PdfWriter()
+    for identite, pdf in zip(identites, pdfs):
+        writer.append(PdfReader(io.BytesIO(pdf)), outline_item=f"{identite['nom']} {identite['prenom']}")
+    writer.page_mode = "/UseOutlines"
+    sortie = io.BytesIO()
+    writer.write(sortie)
+    return sortie.getvalue()
@@ -0,0 +1,44 @@
+import os
+
+# --- CHEMINS UNIVERSELS ---
+# Le paquet est à la racine du projet : on remonte d'un cran depuis ce fichier.
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Les variables d'environnement permettent de pointer vers un autre dossier (benchmarks, essais)
+DATA_DIR = os.environ.get("PEDAGO_DATA_DIR", ROOT_PATH)
+DB_FILE_PATH = os.environ.get("PEDAGO_DB_PATH", os.path.join(ROOT_PATH, "pedago.db"))
+# Instantanés binaires des CSV déjà analysés (reconstructibles, jamais versionnés)
+CACHE_DIR = os.environ.get("PEDAGO_CACHE_DIR", os.path.join(ROOT_PATH, ".cache"))
+# Cache des PDF rendus : budget mémoire (Mo) et déversement facultatif sur disque (CACHE_DIR/pdf)
+PDF_CACHE_OCTETS = int(os.environ.get("PEDAGO_PDF_CACHE_MO", "64")) * 1024 * 1024
+PDF_CACHE_DISQUE = os.environ.get("PEDAGO_PDF_CACHE_DISQUE", "0") == "1"
+# Assistant IA : backend "huggingface" (défaut) ou "factice" (essais et mesures hors ligne) ;
+# PEDAGO_IA_URL pointe le client Hugging Face vers un serveur local compatible (TGI, llama.cpp, vLLM...)
+IA_BACKEND = os.environ.get("PEDAGO_IA_BACKEND", "huggingface")
+IA_URL = os.environ.get("PEDAGO_IA_URL") or None
+IA_MODELE = os.environ.get("PEDAGO_IA_MODELE", "mistralai/Mistral-Nemo-Instruct-2407")
+# Durée maximale d'une génération (s) ; le factice écrit IA_FACTICE_DEBIT morceaux/s (0 = sans attente)
+IA_DELAI_S = float(os.environ.get("PEDAGO_IA_DELAI_S", "120"))
+IA_FACTICE_DEBIT = float(os.environ.get("PEDAGO_IA_FACTICE_DEBIT", "40"))
+# Cache des réponses IA (table ia_cache de la base) : durée de vie en jours, taille totale en Mo
+IA_CACHE_JOURS = float(os.environ.get("PEDAGO_IA_CACHE_JOURS", "30"))
+IA_CACHE_OCTETS = int(float(os.environ.get("PEDAGO_IA_CACHE_MO", "20")) * 1024 * 1024)
+# File d'attente IA commune au processus : appels simultanés, débit amont (appels/min, rafale),
+# essais en cas d'erreur passagère (429, 5xx, réseau) et nombre maximal de demandes en attente
+IA_TRAVAILLEURS = int(os.environ.get("PEDAGO_IA_TRAVAILLEURS", "2"))
+IA_DEBIT_MIN = float(os.environ.get("PEDAGO_IA_DEBIT_MIN", "20"))
+IA_RAFALE = int(os.environ.get("PEDAGO_IA_RAFALE", "3"))
+IA_ESSAIS = int(os.environ.get("PEDAGO_IA_ESSAIS", "3"))
+IA_FILE_MAX = int(os.environ.get("PEDAGO_IA_FILE_MAX", "20"))
+# Bilans d'une classe importée : processus de rendu en parallèle (1 = dans le processus du serveur)
+BILANS_PROCESSUS = int(os.environ.get("PEDAGO_BILANS_PROCESSUS", str(min(4, os.cpu_count() or 1))))
+# Le pool, lancé au premier import, sert ensuite à tous les imports ; ce premier import attend son lancement
+# (~1 s) seulement à partir de ce nombre de bilans, sinon il est rendu dans le processus (~8 ms par bilan)
+BILANS_SEUIL_PARALLELE = int(os.environ.get("PEDAGO_BILANS_SEUIL_PARALLELE", "100"))
+
+# Noms théoriques des fichiers (le vrai nom est retrouvé sans tenir compte de la casse)
+CSV_FILES = {
+    "TIEE": "TIEE.csv",
+    "IMAGE": "Image.csv",
+    "MONTAGE": "montage.csv"
+}
@@ -0,0 +1,108 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from pedago import config
+
+# --- RÉGLAGES SQLITE ---
+# WAL : les lectures ne sont jamais bloquées par une écriture (une classe entière peut valider
+# son quiz pendant qu'un collègue génère une fiche). busy_timeout : un écrivain attend son tour
+# au lieu de lever "database is locked".
+BUSY_TIMEOUT_MS = 10000
+POOL_SIZE = 8
+CACHED_STATEMENTS = 256
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _ouvrir(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                           check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    conn.execute('PRAGMA journal_mode = WAL')
+    # NORMAL suffit en WAL : aucune corruption possible, au pire la dernière transaction est perdue sur coupure
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+def _pool(path):
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = queue.LifoQueue(maxsize=POOL_SIZE)
+        return _pools[path]
+
+# --- ACCÈS ---
+@contextmanager
+def connexion():
+    """Emprunte une connexion du pool (mode autocommit : chaque lecture voit le dernier état validé).
+
+    Les connexions restent ouvertes entre deux reruns, ce qui garde leur cache de requêtes préparées.
+    """
+    path = config.DB_FILE_PATH
+    pool = _pool(path)
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = _ouvrir(path)
+    try:
+        yield conn
+    finally:
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+@contextmanager
+def transaction():
+    """Bloc d'écriture atomique.
+
+    BEGIN IMMEDIATE prend le verrou d'écriture dès le départ : deux écrivains concurrents
+    patientent (busy_timeout) au lieu d'échouer au moment de valider.
+    """
+    with connexion() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+def par_paquets(sql, params=(), paquet=5000):
+    """Lignes d'une requête par listes d'au plus paquet lignes (fetchmany) : exports sans tout charger en mémoire"""
+    with connexion() as conn:
+        curseur = conn.execute(sql, params)
+        while lignes := curseur.fetchmany(paquet):
+            yield lignes
+
+def table_existe(conn, name):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (name,)).fetchone() is not None
+
+_schemas_prets = set()
+_schemas_lock = threading.Lock()
+
+def ensure_schema(nom, script, migration=None):
+    """Exécute un script CREATE ... IF NOT EXISTS une seule fois par base et par processus.
+
+    migration(conn), si fournie, est appelée juste après dans une transaction (remplissage initial d'une table...).
+    """
+    cle = (config.DB_FILE_PATH, nom)
+    if cle in _schemas_prets:
+        return
+    with _schemas_lock:
+        if cle in _schemas_prets:
+            return
+        with connexion() as conn:
+            conn.executescript(script)
+            if migration is not None:
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    migration(conn)
+                except BaseException:
+                    conn.execute('ROLLBACK')
+                    raise
+                conn.execute('COMMIT')
+        _schemas_prets.add(cle)
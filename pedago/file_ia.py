@@ -0,0 +1,328 @@
+import collections
+import math
+import random
+import threading
+import time
+
+from pedago import config, ia
+
+# --- FILE D'ATTENTE IA COMMUNE AU PROCESSUS ---
+# Toutes les sessions (profs, élèves) passent par la même file au lieu d'appeler l'API chacune de
+# leur côté : un nombre borné d'appels simultanés, un seau à jetons qui lisse les rafales sous la
+# limite de l'API gratuite, et de nouveaux essais espacés sur les erreurs passagères (429, 5xx, réseau).
+# Deux demandes identiques (même clé que ia_cache) partagent un seul appel amont : la seconde relit
+# les morceaux déjà reçus puis suit le flux. Les threads ne démarrent qu'à la première demande.
+STATUTS_REESSAYABLES = {408, 425, 429, 500, 502, 503, 504}
+REPRISE_BASE_S = 2
+REPRISE_MAX_S = 30
+# Durée d'une génération supposée tant qu'aucune n'a été mesurée (estimation de l'attente)
+DUREE_DEFAUT_S = 20
+
+def _reessayable(e):
+    """Erreur passagère : trop de requêtes, serveur indisponible, coupure ou délai réseau"""
+    if e is None:
+        return False
+    statut = getattr(getattr(e, 'response', None), 'status_code', None)
+    if statut is not None:
+        return statut in STATUTS_REESSAYABLES
+    return isinstance(e, (TimeoutError, ConnectionError)) or any(mot in type(e).__name__ for mot in ('Timeout', 'Connect'))
+
+def _pause(essai, e):
+    """Retry-After de l'API s'il est donné, sinon attente exponentielle avec gigue"""
+    entetes = getattr(getattr(e, 'response', None), 'headers', None) or {}
+    try:
+        return min(REPRISE_MAX_S, float(entetes.get('Retry-After')))
+    except (TypeError, ValueError):
+        return min(REPRISE_MAX_S, REPRISE_BASE_S * 2 ** (essai - 1)) * random.uniform(0.5, 1)
+
+class SeauJetons:
+    """debit_min appels par minute, jusqu'à rafale d'un coup (debit_min = 0 : pas de limite)"""
+
+    def __init__(self, debit_min, rafale):
+        self.debit_s = debit_min / 60
+        self.rafale = max(1, rafale)
+        self._jetons = float(self.rafale)
+        self._dernier = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _remplir(self):
+        maintenant = time.monotonic()
+        self._jetons = min(self.rafale, self._jetons + (maintenant - self._dernier) * self.debit_s)
+        self._dernier = maintenant
+
+    def reserver(self):
+        """Prend un jeton (éventuellement à crédit) ; renvoie l'attente en secondes avant de s'en servir"""
+        if not self.debit_s:
+            return 0.0
+        with self._lock:
+            self._remplir()
+            self._jetons -= 1
+            return 0.0 if self._jetons >= 0 else -self._jetons / self.debit_s
+
+    def attente_pour(self, n):
+        """Attente (s) avant que n appels de plus puissent partir"""
+        if not self.debit_s:
+            return 0.0
+        with self._lock:
+            self._remplir()
+            return max(0.0, n - self._jetons) / self.debit_s
+
+class Tache:
+    """Un appel amont et ses morceaux, partagé par toutes les demandes identiques.
+
+    etat : "file" (en attente d'un travailleur), "debit" (limite de débit), "reprise" (pause avant
+    un nouvel essai), "cours" (appel en cours), "fini".
+    """
+
+    def __init__(self, cle, backend, messages, max_tokens, temperature, delai_s):
+        self.cle = cle
+        self.backend = backend
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.delai_s = delai_s
+        self.morceaux = []
+        self.erreur = None
+        self.termine = False
+        self.etat = "file"
+        self.soumise_le = time.monotonic()
+        self.demarree_le = self.depart_prevu = None
+        self.abonnes = 0
+        self.annulee = False
+        self.cond = threading.Condition()
+
+    def patienter(self, etat, duree_s):
+        """Pause de débit ou de reprise ; renvoie True si la tâche a été annulée entre-temps"""
+        with self.cond:
+            self.etat, self.depart_prevu = etat, time.monotonic() + duree_s
+            self.cond.notify_all()
+            self.cond.wait_for(lambda: self.annulee, timeout=duree_s)
+            return self.annulee
+
+    def demarrer(self):
+        with self.cond:
+            self.etat, self.depart_prevu = "cours", None
+            if self.demarree_le is None:
+                self.demarree_le = time.monotonic()
+            self.cond.notify_all()
+
+    def ajouter(self, morceau):
+        with self.cond:
+            self.morceaux.append(morceau)
+            self.cond.notify_all()
+
+    def finir(self, erreur=None, termine=False):
+        with self.cond:
+            self.erreur, self.termine, self.etat = erreur, termine, "fini"
+            self.cond.notify_all()
+
+class Abonnement:
+    """Une demande d'une session : s'itère comme ia.Generation (texte, erreur, termine).
+
+    Fermer l'itérateur (run Streamlit interrompu, « Annuler ») désabonne la session ; l'appel amont
+    n'est abandonné que si plus personne ne l'attend.
+    """
+
+    def __init__(self, planificateur, tache, partagee):
+        self.planificateur = planificateur
+        self.tache = tache
+        self.partagee = partagee
+        self.cree_le = time.monotonic()
+        self._ferme = False
+
+    messages = property(lambda self: self.tache.messages)
+    max_tokens = property(lambda self: self.tache.max_tokens)
+    temperature = property(lambda self: self.tache.temperature)
+    erreur = property(lambda self: self.tache.erreur)
+    termine = property(lambda self: self.tache.termine)
+
+    @property
+    def texte(self):
+        return "".join(self.tache.morceaux)
+
+    @property
+    def attente_s(self):
+        """Temps passé par cette demande avant le départ de l'appel amont"""
+        depart = self.tache.demarree_le or time.monotonic()
+        return max(0.0, depart - self.cree_le)
+
+    def attendre_depart(self, intervalle_s=0.5):
+        """Génère la situation dans la file (voir Planificateur.situation) jusqu'au départ de l'appel"""
+        tache = self.tache
+        try:
+            while True:
+                with tache.cond:
+                    if tache.etat in ("cours", "fini"):
+                        return
+                yield self.planificateur.situation(tache)
+                with tache.cond:
+                    tache.cond.wait(intervalle_s)
+        except GeneratorExit:
+            self.fermer()
+            raise
+
+    def __iter__(self):
+        tache, lus = self.tache, 0
+        try:
+            while True:
+                with tache.cond:
+                    tache.cond.wait_for(lambda: len(tache.morceaux) > lus or tache.etat == "fini")
+                    nouveaux, fini = tache.morceaux[lus:], tache.etat == "fini"
+                lus += len(nouveaux)
+                yield from nouveaux
+                if fini:
+                    return
+        finally:
+            self.fermer()
+
+    def fermer(self):
+        if not self._ferme:
+            self._ferme = True
+            self.planificateur.desabonner(self.tache)
+
+class Planificateur:
+    """File commune : travailleurs bornés, seau à jetons, essais espacés, fusion des demandes identiques"""
+
+    def __init__(self, travailleurs, debit_min, rafale, essais, file_max):
+        self.nb_travailleurs = max(1, travailleurs)
+        self.seau = SeauJetons(debit_min, rafale)
+        self.essais = max(1, essais)
+        self.file_max = file_max
+        self._file = collections.deque()
+        # Tâches en file ou en cours, par clé : une demande identique s'y abonne
+        self._taches = {}
+        self._cond = threading.Condition()
+        self._travailleurs = []
+        self._actives = 0
+        self._durees = collections.deque(maxlen=20)
+        self.appels = self.fusions = self.reprises = self.refus = 0
+
+    def soumettre(self, backend, messages, max_tokens=ia.MAX_TOKENS, temperature=ia.TEMPERATURE, delai_s=None):
+        cle = ia.cle_cache(backend, messages, max_tokens, temperature)
+        with self._cond:
+            tache, partagee = self._taches.get(cle), True
+            if tache is not None:
+                self.fusions += 1
+            else:
+                partagee = False
+                tache = Tache(cle, backend, messages, max_tokens, temperature, delai_s or config.IA_DELAI_S)
+                if len(self._file) >= self.file_max:
+                    self.refus += 1
+                    tache.finir(f"trop de demandes en attente ({len(self._file)}), réessayez dans un instant")
+                else:
+                    self._taches[cle] = tache
+                    self._file.append(tache)
+                    self._demarrer_travailleurs()
+                    self._cond.notify()
+            tache.abonnes += 1
+        return Abonnement(self, tache, partagee)
+
+    def desabonner(self, tache):
+        with self._cond:
+            tache.abonnes -= 1
+            if tache.abonnes > 0 or tache.etat == "fini":
+                return
+            # Plus personne n'attend : retirée de la file, ou interrompue par son travailleur
+            if self._taches.get(tache.cle) is tache:
+                del self._taches[tache.cle]
+            if tache in self._file:
+                self._file.remove(tache)
+                tache.finir("génération annulée")
+        with tache.cond:
+            tache.annulee = True
+            tache.cond.notify_all()
+
+    def _demarrer_travailleurs(self):
+        while len(self._travailleurs) < self.nb_travailleurs:
+            travailleur = threading.Thread(target=self._travailler, name=f"file-ia-{len(self._travailleurs)}", daemon=True)
+            self._travailleurs.append(travailleur)
+            travailleur.start()
+
+    def _travailler(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._file)
+                tache = self._file.popleft()
+                self._actives += 1
+            try:
+                self._executer(tache)
+            except Exception as e:
+                print(f"File IA : tâche interrompue ({e})")
+            finally:
+                with self._cond:
+                    self._actives -= 1
+                    if self._taches.get(tache.cle) is tache:
+                        del self._taches[tache.cle]
+                if tache.etat != "fini":
+                    tache.finir("génération interrompue")
+
+    def _executer(self, tache):
+        generation = None
+        for essai in range(1, self.essais + 1):
+            attente = self.seau.reserver()
+            if attente and tache.patienter("debit", attente):
+                break
+            if tache.annulee:
+                break
+            tache.demarrer()
+            with self._cond:
+                self.appels += 1
+            generation = ia.Generation(tache.backend, tache.messages, tache.max_tokens, tache.temperature, tache.delai_s)
+            flux = iter(generation)
+            try:
+                for morceau in flux:
+                    tache.ajouter(morceau)
+                    if tache.annulee:
+                        break
+            finally:
+                # Fermer le générateur ferme la connexion au backend
+                flux.close()
+            # Un nouvel essai seulement si rien n'a encore été reçu (sinon le texte serait en double)
+            if tache.annulee or generation.termine or tache.morceaux or not _reessayable(generation.exception):
+                break
+            if essai < self.essais:
+                with self._cond:
+                    self.reprises += 1
+                if tache.patienter("reprise", _pause(essai, generation.exception)):
+                    break
+        if tache.annulee:
+            tache.finir("génération annulée")
+            return
+        with self._cond:
+            self._durees.append(time.monotonic() - tache.demarree_le)
+        termine = generation.termine and not generation.erreur
+        # Réponse complète : enregistrée une seule fois dans ia_cache, quel que soit le nombre d'abonnés
+        if termine:
+            try:
+                ia.ecrire_cache(tache.cle, tache.backend, tache.temperature, generation.texte)
+            except Exception as e:
+                print(f"File IA : réponse non mise en cache ({e})")
+        tache.finir(generation.erreur, termine)
+
+    def situation(self, tache):
+        """etat, position (1 = prochaine à partir), en_file, actives, attente_s (écoulée), estimee_s (restante)"""
+        maintenant = time.monotonic()
+        with self._cond:
+            position = self._file.index(tache) + 1 if tache in self._file else 0
+            en_file, actives = len(self._file), self._actives
+            duree = sum(self._durees) / len(self._durees) if self._durees else DUREE_DEFAUT_S
+        if tache.depart_prevu is not None:
+            estimee = max(0.0, tache.depart_prevu - maintenant)
+        else:
+            # Chaque vague de nb_travailleurs tâches devant elle dure environ une génération ; le débit peut retarder davantage
+            vagues = math.ceil(position / self.nb_travailleurs) if actives >= self.nb_travailleurs else 0
+            estimee = max(vagues * duree, self.seau.attente_pour(position))
+        return {"etat": tache.etat, "position": position, "en_file": en_file, "actives": actives,
+                "attente_s": maintenant - tache.soumise_le, "estimee_s": estimee}
+
+    def stats(self):
+        with self._cond:
+            return {"en_file": len(self._file), "actives": self._actives, "appels": self.appels,
+                    "fusions": self.fusions, "reprises": self.reprises, "refus": self.refus}
+
+# Une seule file par processus, partagée par toutes les sessions de la page Assistant IA
+planificateur = Planificateur(config.IA_TRAVAILLEURS, config.IA_DEBIT_MIN, config.IA_RAFALE, config.IA_ESSAIS, config.IA_FILE_MAX)
+
+def soumettre(backend, messages):
+    """Demande de génération dans la file commune ; l'itérer donne les morceaux au fil de l'eau"""
+    return planificateur.soumettre(backend, messages)
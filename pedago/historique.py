@@ -0,0 +1,204 @@
+import datetime
+import hashlib
+import json
+
+from pedago import db, referentiel
+
+# --- HISTORIQUE DES FICHES GÉNÉRÉES ---
+# Une ligne par fiche (métadonnées) + une table de liens étroite vers les identifiants du référentiel.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fiches (
+    id INTEGER PRIMARY KEY, cle TEXT NOT NULL UNIQUE, date TEXT, classe TEXT NOT NULL DEFAULT '',
+    doc_id TEXT, titre TEXT, enregistree_le TEXT);
+CREATE INDEX IF NOT EXISTS idx_fiches_classe_date ON fiches (classe, date);
+CREATE TABLE IF NOT EXISTS fiche_skills (
+    fiche_id INTEGER NOT NULL REFERENCES fiches(id), skill_id INTEGER NOT NULL REFERENCES ref_skills(id),
+    PRIMARY KEY (fiche_id, skill_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_fiche_skills_skill ON fiche_skills (skill_id);
+-- Compteur de changements (fiche ajoutée, résumé reconstruit) : jeton des caches de la page Statistiques
+CREATE TABLE IF NOT EXISTS historique_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL);
+INSERT OR IGNORE INTO historique_version (id, version) VALUES (1, 0);
+"""
+
+# Résumé tenu à jour à chaque enregistrement : une ligne par (classe, savoir-faire)
+SCHEMA_COUVERTURE = """
+CREATE TABLE IF NOT EXISTS couverture (
+    classe TEXT NOT NULL, skill_id INTEGER NOT NULL REFERENCES ref_skills(id),
+    nb INTEGER NOT NULL, premiere_date TEXT, derniere_date TEXT,
+    PRIMARY KEY (classe, skill_id)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_couverture_skill ON couverture (skill_id);
+"""
+
+# Vue de compatibilité : même colonnes que l'ancienne table à plat (exports, requêtes manuelles)
+VUE_HISTORIQUE = """
+CREATE VIEW IF NOT EXISTS historique AS
+SELECT f.id AS fiche_id, f.cle AS fiche_cle, f.date, f.classe, d.code AS domaine, c.libelle AS competence, s.libelle AS skill
+FROM fiche_skills fs
+JOIN fiches f ON f.id = fs.fiche_id
+JOIN ref_skills s ON s.id = fs.skill_id
+JOIN ref_domaines d ON d.id = s.domaine_id
+JOIN ref_competences c ON c.id = s.competence_id;
+"""
+
+UPSERT_COUVERTURE = '''INSERT INTO couverture (classe, skill_id, nb, premiere_date, derniere_date) VALUES (?, ?, 1, ?, ?)
+    ON CONFLICT (classe, skill_id) DO UPDATE SET
+        nb = nb + 1,
+        premiere_date = MIN(premiere_date, excluded.premiere_date),
+        derniere_date = MAX(derniere_date, excluded.derniere_date)'''
+
+def _remplir_couverture(conn):
+    """(Re)calcule le résumé à partir des fiches enregistrées"""
+    conn.execute('DELETE FROM couverture')
+    conn.execute('''INSERT INTO couverture (classe, skill_id, nb, premiere_date, derniere_date)
+        SELECT f.classe, fs.skill_id, COUNT(*), MIN(f.date), MAX(f.date)
+        FROM fiche_skills fs JOIN fiches f ON f.id = fs.fiche_id
+        GROUP BY f.classe, fs.skill_id''')
+
+def _migrer_table_historique(conn):
+    """Convertit l'ancienne table à plat 'historique' en fiches + fiche_skills.
+
+    Les lignes antérieures à la clé de fiche sont regroupées par (date, classe). Les savoir-faire introuvables
+    dans le référentiel sont comptés et signalés.
+    """
+    rows = conn.execute('SELECT date, classe, domaine, competence, skill, '
+                        + ('fiche_cle' if 'fiche_cle' in _colonnes(conn, 'historique') else 'NULL')
+                        + ' FROM historique ORDER BY id').fetchall()
+    absents = []
+    skill_ids = referentiel.resolve_skill_ids(conn, [(dom or 'Inconnu', comp or '', skill or '') for _, _, dom, comp, skill, _ in rows],
+                                              absents)
+    if absents:
+        print(f"⚠️ Migration de l'historique : {len(absents)} savoir-faire introuvable(s) dans le référentiel, "
+              f"conservé(s) inactif(s) (hors statistiques)")
+    fiche_ids = {}
+    for date_iso, classe, dom, _, skill, cle in rows:
+        cle = cle or f"ancien:{date_iso}|{classe or ''}"
+        if cle not in fiche_ids:
+            fiche_ids[cle] = conn.execute('INSERT INTO fiches (cle, date, classe) VALUES (?, ?, ?) RETURNING id',
+                                          (cle, date_iso, classe or '')).fetchone()[0]
+        conn.execute('INSERT OR IGNORE INTO fiche_skills (fiche_id, skill_id) VALUES (?, ?)',
+                     (fiche_ids[cle], skill_ids[(dom or 'Inconnu', skill or '')]))
+    conn.execute('DROP TABLE historique')
+
+def _colonnes(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def _migrer(conn):
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'historique'").fetchone():
+        _migrer_table_historique(conn)
+    if 'skill_id' not in _colonnes(conn, 'couverture'):
+        # Ancien résumé indexé sur le texte des savoir-faire
+        conn.execute('DROP TABLE IF EXISTS couverture')
+    for statement in SCHEMA_COUVERTURE.split(';') + [VUE_HISTORIQUE]:
+        if statement.strip():
+            conn.execute(statement)
+    if conn.execute('SELECT 1 FROM couverture LIMIT 1').fetchone() is None:
+        _remplir_couverture(conn)
+
+def init_history_db():
+    referentiel.init_schema()
+    db.ensure_schema('historique', SCHEMA, migration=_migrer)
+
+def _changer_version(conn):
+    conn.execute('UPDATE historique_version SET version = version + 1')
+
+def version():
+    init_history_db()
+    with db.connexion() as conn:
+        return conn.execute('SELECT version FROM historique_version').fetchone()[0]
+
+def rebuild_couverture():
+    """Reconstruit entièrement la table couverture depuis les fiches (bouton de la page Statistiques)"""
+    init_history_db()
+    with db.transaction() as conn:
+        _remplir_couverture(conn)
+        _changer_version(conn)
+
+def fiche_key(info, blocks):
+    """Clé stable d'une fiche : identifiant, date, classe et blocs (ni le titre ni les textes libres).
+
+    Corriger une faute de frappe puis régénérer le PDF redonne la même clé.
+    """
+    contenu = {
+        "doc_id": info.get('doc_id') or "", "date": str(info['date']), "classe": info['classe'] or "",
+        "blocks": sorted([block.get('domain') or "", block['competence'], block.get('label') or "", sorted(block['skills'])]
+                         for block in blocks)
+    }
+    return hashlib.sha256(json.dumps(contenu, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _skills_fiche(blocks):
+    """(domaine, compétence, savoir-faire) de la fiche, sans doublon"""
+    triples = {}
+    for block in blocks:
+        domaine = block.get('domain', 'Inconnu')
+        for skill in block['skills']:
+            triples.setdefault((domaine, skill), (domaine, block['competence'], skill))
+    return list(triples.values())
+
+def save_sessions_to_history(sessions):
+    """Enregistre plusieurs fiches (couples info, blocks) en une seule transaction.
+
+    Une fiche déjà enregistrée (même clé) n'est pas dupliquée : seuls son titre et son identifiant
+    sont mis à jour. Renvoie le nombre de fiches réellement ajoutées.
+    """
+    init_history_db()
+    # Tout est préparé avant de prendre le verrou d'écriture
+    fiches = {}
+    for info, blocks in sessions:
+        triples = _skills_fiche(blocks)
+        if triples:
+            fiches.setdefault(fiche_key(info, blocks), (info, triples))
+    if not fiches:
+        return 0
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    nouvelles = 0
+    liens, resume = [], []
+    with db.transaction() as conn:
+        for cle, (info, triples) in fiches.items():
+            date_iso, classe = str(info['date']), info['classe'] or ''
+            existante = conn.execute('SELECT id FROM fiches WHERE cle = ?', (cle,)).fetchone()
+            if existante:
+                conn.execute('UPDATE fiches SET titre = ?, doc_id = ? WHERE id = ?',
+                             (info.get('title'), info.get('doc_id'), existante[0]))
+                continue
+            fiche_id = conn.execute('''INSERT INTO fiches (cle, date, classe, doc_id, titre, enregistree_le)
+                VALUES (?, ?, ?, ?, ?, ?) RETURNING id''',
+                (cle, date_iso, classe, info.get('doc_id'), info.get('title'), now)).fetchone()[0]
+            skill_ids = referentiel.resolve_skill_ids(conn, triples)
+            for skill_id in dict.fromkeys(skill_ids.values()):
+                liens.append((fiche_id, skill_id))
+                resume.append((classe, skill_id, date_iso, date_iso))
+            nouvelles += 1
+        conn.executemany('INSERT INTO fiche_skills (fiche_id, skill_id) VALUES (?, ?)', liens)
+        # Même transaction : le résumé ne peut pas diverger de l'historique
+        conn.executemany(UPSERT_COUVERTURE, resume)
+        if nouvelles:
+            _changer_version(conn)
+    return nouvelles
+
+def save_session_to_history(info, blocks):
+    """Renvoie True si la fiche est nouvelle, False si elle était déjà dans l'historique"""
+    return save_sessions_to_history([(info, blocks)]) > 0
+
+# --- EXPORT ---
+# Une ligne par fiche et savoir-faire, fiches les plus récentes d'abord (lue par paquets, voir pedago.exports)
+COLONNES_EXPORT = ['date', 'classe', 'doc_id', 'titre', 'domaine', 'competence', 'skill']
+
+def paquets_historique(classe=None, domaine=None, paquet=5000):
+    init_history_db()
+    conditions, params = [], []
+    if classe is not None:
+        conditions.append('f.classe = ?')
+        params.append(classe)
+    if domaine:
+        conditions.append('d.code = ?')
+        params.append(domaine)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    yield from db.par_paquets(f'''SELECT f.date, f.classe, f.doc_id, f.titre, d.code, c.libelle, s.libelle
+        FROM fiches f
+        JOIN fiche_skills fs ON fs.fiche_id = f.id
+        JOIN ref_skills s ON s.id = fs.skill_id
+        JOIN ref_domaines d ON d.id = s.domaine_id
+        JOIN ref_competences c ON c.id = s.competence_id
+        {where}
+        ORDER BY f.date DESC, f.id DESC, s.id''', params, paquet)
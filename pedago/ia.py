@@ -0,0 +1,230 @@
+import datetime
+import hashlib
+import json
+import random
+import time
+from abc import ABC, abstractmethod
+
+from pedago import config, db
+
+# --- ASSISTANT IA : GÉNÉRATION EN FLUX ---
+# Un backend renvoie la réponse morceau par morceau : la page l'affiche au fil de l'eau (st.write_stream)
+# au lieu de rester figée jusqu'au dernier token. Hugging Face (ou un serveur local compatible) en service,
+# backend factice déterministe pour mesurer latence et débit sans réseau ni quota.
+MAX_TOKENS = 1500
+TEMPERATURE = 0.7
+PROMPT_SYSTEME = "Tu es un professeur expert en BTS Audiovisuel. Tu réponds en Français."
+
+def construire_messages(domaine, materiel, competences, niveau, duree):
+    # Listes triées : l'ordre des clics dans les multiselect ne change ni la demande ni la clé de cache
+    materiel, competences = sorted(set(materiel)), sorted(set(competences))
+    prompt_user = f"""
+    Agis comme un expert pédagogique. Crée une fiche d'activité pratique (TP) pour : {domaine}.
+    
+    INFORMATIONS :
+    - Niveau : {niveau}
+    - Durée : {duree}
+    - Matériel DISPONIBLE : {', '.join(materiel)}
+    - Compétences À VALIDER : {', '.join(competences)}
+    
+    Structure ta réponse en Markdown avec les sections suivantes :
+    1. Titre de l'activité
+    2. Contexte professionnel
+    3. Objectifs pédagogiques
+    4. Déroulement étape par étape
+    5. Critères d'évaluation
+    """
+    return [
+        {"role": "system", "content": PROMPT_SYSTEME},
+        {"role": "user", "content": prompt_user}
+    ]
+
+class Backend(ABC):
+    """Interface : flux(messages, max_tokens, temperature) -> itérateur de morceaux de texte"""
+    nom = "?"
+    repo_id = None
+
+    @abstractmethod
+    def flux(self, messages, max_tokens, temperature):
+        """Itérateur des morceaux de texte de la réponse"""
+
+class HuggingFace(Backend):
+    """API d'inférence Hugging Face ; avec url, n'importe quel serveur local compatible OpenAI"""
+    nom = "huggingface"
+
+    def __init__(self, token, repo_id=None, url=None, delai_lecture_s=30):
+        self.token = token
+        self.repo_id = repo_id or config.IA_MODELE
+        self.url = url
+        # Délai sans aucun octet reçu (connexion, premier token, token suivant)
+        self.delai_lecture_s = delai_lecture_s
+
+    def flux(self, messages, max_tokens, temperature):
+        # Client importé seulement au moment de générer
+        from huggingface_hub import InferenceClient
+        client = InferenceClient(token=self.token, base_url=self.url, timeout=self.delai_lecture_s)
+        reponse = client.chat_completion(model=self.repo_id, messages=messages, max_tokens=max_tokens,
+                                         temperature=temperature, stream=True)
+        try:
+            for morceau in reponse:
+                if morceau.choices and morceau.choices[0].delta.content:
+                    yield morceau.choices[0].delta.content
+        finally:
+            # Annulation ou délai dépassé : la connexion HTTP est fermée tout de suite
+            fermer = getattr(reponse, 'close', None)
+            if fermer:
+                fermer()
+
+ETAPES_FACTICES = [
+    "Présentation du matériel et des consignes de sécurité", "Câblage et vérification de la chaîne",
+    "Réglages et mise en configuration", "Essais en binôme avec inversion des rôles",
+    "Production en conditions réelles", "Débriefing collectif et auto-évaluation", "Rangement et rapport d'intervention",
+]
+VOCABULAIRE_FACTICE = ("signal vidéo liaison contrôle réglage niveau synchronisation plateau régie équipe consigne "
+                       "vérification sécurité qualité diffusion enregistrement procédure câble format").split()
+
+class Factice(Backend):
+    """Réponse déterministe (même prompt -> même texte) à latence et débit réglables, sans réseau"""
+    nom = "factice"
+    repo_id = "factice"
+
+    def __init__(self, latence_s=0.0, morceaux_par_s=0.0, mots=400):
+        self.latence_s = latence_s
+        self.morceaux_par_s = morceaux_par_s
+        self.mots = mots
+
+    def rediger(self, messages):
+        consigne = messages[-1]["content"]
+        rng = random.Random(hashlib.sha256(consigne.encode('utf-8')).digest())
+        infos = [ligne.strip() for ligne in consigne.splitlines() if ligne.strip().startswith("- ")]
+        etapes = rng.sample(ETAPES_FACTICES, 4)
+        corps = " ".join(rng.choice(VOCABULAIRE_FACTICE) for _ in range(self.mots))
+        return "\n".join([
+            f"# Activité {rng.randrange(1000):03d} (réponse factice)", "",
+            "## Contexte professionnel", *infos, "",
+            "## Objectifs pédagogiques", corps[:200], "",
+            "## Déroulement étape par étape", *[f"{i}. {etape}" for i, etape in enumerate(etapes, 1)], "", corps, "",
+            "## Critères d'évaluation", "- Respect des procédures", "- Qualité du résultat", "",
+        ])
+
+    def flux(self, messages, max_tokens, temperature):
+        time.sleep(self.latence_s)
+        mots = self.rediger(messages).split(" ")[:max_tokens]
+        for i, mot in enumerate(mots):
+            if self.morceaux_par_s:
+                time.sleep(1 / self.morceaux_par_s)
+            yield mot if i == len(mots) - 1 else mot + " "
+
+def jeton_requis():
+    """Le jeton Hugging Face n'est demandé que pour l'API distante"""
+    return config.IA_BACKEND == "huggingface" and not config.IA_URL
+
+def backend_configure(token=None):
+    """Backend choisi par PEDAGO_IA_BACKEND (voir config)"""
+    if config.IA_BACKEND == "factice":
+        return Factice(morceaux_par_s=config.IA_FACTICE_DEBIT)
+    if config.IA_BACKEND == "huggingface":
+        return HuggingFace(token, url=config.IA_URL)
+    raise ValueError(f"Backend IA inconnu : {config.IA_BACKEND}")
+
+class Generation:
+    """Une génération : l'itérer donne les morceaux au fil de l'eau.
+
+    Erreur du backend ou délai dépassé : le flux s'arrête sans exception, .erreur le dit et le texte
+    déjà reçu reste dans .texte. Fermer l'itérateur (run Streamlit interrompu) ferme la connexion.
+    """
+
+    def __init__(self, backend, messages, max_tokens=MAX_TOKENS, temperature=TEMPERATURE, delai_s=None):
+        self.backend = backend
+        self.messages = messages
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.delai_s = delai_s or config.IA_DELAI_S
+        self.morceaux = []
+        self.erreur = None
+        self.exception = None
+        self.termine = False
+        self.premier_morceau_s = self.duree_s = None
+
+    def __iter__(self):
+        debut = time.monotonic()
+        flux = None
+        try:
+            flux = iter(self.backend.flux(self.messages, self.max_tokens, self.temperature))
+            for morceau in flux:
+                if self.premier_morceau_s is None:
+                    self.premier_morceau_s = time.monotonic() - debut
+                self.morceaux.append(morceau)
+                yield morceau
+                if time.monotonic() - debut > self.delai_s:
+                    self.erreur = f"délai de {self.delai_s:g} s dépassé, réponse incomplète"
+                    return
+            self.termine = True
+        except Exception as e:
+            self.erreur = str(e)
+            self.exception = e
+        finally:
+            self.duree_s = time.monotonic() - debut
+            fermer = getattr(flux, 'close', None)
+            if fermer:
+                fermer()
+
+    @property
+    def texte(self):
+        return "".join(self.morceaux)
+
+# --- CACHE DES RÉPONSES (table ia_cache) ---
+# Même demande (prompt normalisé, modèle, température) -> même fiche, relue en quelques millisecondes
+# au lieu d'un aller-retour d'inférence et d'un quota gratuit consommé. Seules les réponses complètes
+# sont enregistrées ; durée de vie et taille totale bornées (les moins récemment relues partent d'abord).
+VERSION_CACHE = 1
+SCHEMA_CACHE = """
+CREATE TABLE IF NOT EXISTS ia_cache (
+    cle TEXT PRIMARY KEY, backend TEXT NOT NULL, repo_id TEXT NOT NULL, temperature REAL NOT NULL,
+    reponse TEXT NOT NULL, octets INTEGER NOT NULL, cree_le TEXT NOT NULL, utilise_le TEXT NOT NULL,
+    nb_utilisations INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_ia_cache_utilise ON ia_cache (utilise_le);
+"""
+
+def init_cache_db():
+    db.ensure_schema('ia_cache', SCHEMA_CACHE)
+
+def cle_cache(backend, messages, max_tokens=MAX_TOKENS, temperature=TEMPERATURE):
+    """sha256 du prompt normalisé (espaces), du backend, du modèle, de la température et de max_tokens"""
+    normalises = [(m["role"], " ".join(m["content"].split())) for m in messages]
+    contenu = json.dumps([VERSION_CACHE, backend.nom, backend.repo_id, float(temperature), max_tokens, normalises], ensure_ascii=False)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+def _maintenant():
+    return datetime.datetime.now().isoformat(timespec='seconds')
+
+def _limite_ttl():
+    return (datetime.datetime.now() - datetime.timedelta(days=config.IA_CACHE_JOURS)).isoformat(timespec='seconds')
+
+def lire_cache(cle):
+    """(réponse, date de génération) si la demande a déjà une réponse encore valable, sinon None"""
+    init_cache_db()
+    with db.connexion() as conn:
+        row = conn.execute('SELECT reponse, cree_le FROM ia_cache WHERE cle = ? AND cree_le >= ?', (cle, _limite_ttl())).fetchone()
+    if row is None:
+        return None
+    with db.transaction() as conn:
+        conn.execute('UPDATE ia_cache SET utilise_le = ?, nb_utilisations = nb_utilisations + 1 WHERE cle = ?', (_maintenant(), cle))
+    return row
+
+def ecrire_cache(cle, backend, temperature, reponse):
+    """Enregistre (ou remplace, après « régénérer ») une réponse complète, puis fait respecter durée de vie et taille"""
+    init_cache_db()
+    maintenant = _maintenant()
+    with db.transaction() as conn:
+        conn.execute('''INSERT OR REPLACE INTO ia_cache (cle, backend, repo_id, temperature, reponse, octets, cree_le, utilise_le)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', (cle, backend.nom, backend.repo_id, float(temperature), reponse,
+                                            len(reponse.encode('utf-8')), maintenant, maintenant))
+        _elaguer_cache(conn)
+
+def _elaguer_cache(conn):
+    conn.execute('DELETE FROM ia_cache WHERE cree_le < ?', (_limite_ttl(),))
+    # Au-delà du budget : on garde les plus récemment utilisées tant que leur cumul tient dedans
+    conn.execute('''DELETE FROM ia_cache WHERE cle IN (
+        SELECT cle FROM (SELECT cle, SUM(octets) OVER (ORDER BY utilise_le DESC, cle) AS cumul FROM ia_cache)
+        WHERE cumul > ?)''', (config.IA_CACHE_OCTETS,))
@@ -0,0 +1,51 @@
+import datetime
+
+from fpdf import FPDF
+
+from pedago.pdf_layout import Cellule, Tableau
+from pedago.texte import clean_text
+
+# --- BILAN INDIVIDUEL (page Auto-Évaluation) ---
+class PDFBilan(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 16)
+        self.cell(0, 10, 'BILAN INDIVIDUEL DE COMPETENCES', 0, 1, 'C')
+        self.ln(10)
+
+def create_bilan_pdf(identite, df_res):
+    pdf = PDFBilan()
+    pdf.add_page()
+    
+    # Infos Élève
+    pdf.set_font('Arial', '', 12)
+    pdf.set_fill_color(240, 240, 240)
+    pdf.cell(0, 10, clean_text(f"Eleve : {identite['nom']} {identite['prenom']}  |  Classe : {identite['classe']}"), 1, 1, 'L', 1)
+    pdf.cell(0, 10, clean_text(f"Date : {datetime.datetime.now().strftime('%d/%m/%Y')}"), 1, 1, 'L', 1)
+    pdf.ln(10)
+    
+    # Tableau Résultats (en-têtes répétés si le bilan déborde sur une seconde page)
+    w_poste = 60
+    w_score = 20
+    w_statut = 30
+    w_conseil = 80
+    
+    noir, blanc = (50, 50, 50), (255, 255, 255)
+    entete = [Cellule(titre, largeur, align='C', style='B', taille=11, fond=noir, couleur=blanc, multi=False)
+              for titre, largeur in (("Poste / Activite", w_poste), ("Note", w_score), ("Statut", w_statut), ("Suggestions", w_conseil))]
+    tableau = Tableau(pdf, entete=(entete, 10))
+    tableau.dessiner_entete()
+    
+    # Couleur de fond selon le statut : 1 Critique, 2 Moyen, 3 Bon
+    fonds = {1: (255, 235, 235), 2: (255, 245, 230)}
+    for poste, score, score_max, statut, conseil, priorite in df_res[['Poste', 'Score', 'Max', 'Statut', 'Conseil', 'Priorite']].itertuples(index=False):
+        fond = fonds.get(priorite, (235, 255, 235))
+        # Statut : nettoyage des emojis pour le PDF
+        statut_clean = clean_text(statut.replace("🟢", "").replace("🟠", "").replace("🔴", "").strip())
+        # Hauteur dynamique (basée sur le conseil qui est le plus long)
+        tableau.ligne([Cellule(clean_text(poste), w_poste, taille=10, fond=fond, multi=False),
+                       Cellule(f"{score}/{score_max}", w_score, align='C', taille=10, fond=fond, multi=False),
+                       Cellule(statut_clean, w_statut, align='C', taille=10, fond=fond, multi=False),
+                       Cellule(clean_text(conseil), w_conseil, interligne=6, taille=10)],
+                      hauteur_min=10, marge=4)
+        
+    return pdf.output(dest='S').encode('latin-1', 'replace')
@@ -0,0 +1,98 @@
+from fpdf import FPDF
+
+from pedago.pdf_layout import Cellule, Tableau
+from pedago.texte import clean_text
+
+# --- FICHE D'ÉVALUATION (page 3) ---
+class PDFEval(FPDF):
+    def header(self):
+        pass
+
+# Grille de notation : texte + 4 cases (0 à 3) ; l'en-tête (police 9, hauteur fine 5mm) est répété à chaque page
+W_TEXT = 150
+W_NOTE = 10
+ENTETE_GRILLE = ([Cellule("Competences / Savoirs-faire Evalues", W_TEXT, align='C', style='B', fond=(220, 220, 220), multi=False)]
+                 + [Cellule(str(note), W_NOTE, align='C', style='B', fond=(220, 220, 220), multi=False) for note in range(4)], 5)
+CASES_NOTES = [Cellule("", W_NOTE)] * 4
+
+def create_eval_pdf(info, blocks):
+    pdf = PDFEval()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=False)
+
+    # --- EN-TÊTE COMPACT ---
+    pdf.set_font('Arial', 'B', 16) # Titre un peu plus petit
+    pdf.cell(0, 8, "FICHE D'EVALUATION", 0, 1, 'C')
+    pdf.ln(2)
+    
+    pdf.set_font('Arial', '', 10) # Police infos réduite
+    y_start = pdf.get_y()
+    
+    # Cadre réduit en hauteur (18mm au lieu de 25)
+    pdf.rect(10, y_start, 190, 18) 
+    
+    pdf.set_xy(15, y_start + 4)
+    pdf.cell(100, 6, "Nom / Prenom : ............................................................", 0, 0)
+    pdf.cell(80, 6, f"Date : {clean_text(str(info['date']))}", 0, 1, 'R')
+    
+    pdf.set_xy(15, y_start + 10)
+    txt_seq = f"Seq {info['seq']}" if info['seq'] else ""
+    txt_sea = f"Sea {info['sea']}" if info['sea'] else ""
+    full_context = f"Classe : {clean_text(info['classe'])}   |   {info['type_eval']}   |   {txt_seq}  {txt_sea}"
+    pdf.cell(0, 6, clean_text(full_context), 0, 1, 'L')
+    
+    pdf.set_y(y_start + 22) # On colle le reste juste dessous
+
+    if info['desc']:
+        pdf.set_font('Arial', 'B', 9)
+        pdf.cell(0, 5, "Contexte :", 0, 1)
+        pdf.set_font('Arial', '', 9)
+        pdf.multi_cell(0, 4, clean_text(info['desc'])) # Interligne 4mm
+        pdf.ln(3)
+
+    # --- TABLEAU ---
+    tableau = Tableau(pdf, bas=297 - 10, entete=ENTETE_GRILLE) # Marge bas réduite à 10
+    tableau.dessiner_entete()
+    bleu, encre = (240, 245, 255), (0, 50, 100)
+    
+    for block in blocks:
+        # --- ENTÊTE SPLITTÉ COMPACT : activité (police 9) | compétence (police 8) ---
+        entete = tableau.mesurer([
+            Cellule(f"Act : {clean_text(block['label'])}", 70, interligne=6, style='B', taille=9, fond=bleu, couleur=encre),
+            Cellule(f"Comp : {clean_text(block['competence'])}", 120, interligne=6, style='I', taille=8, fond=bleu, couleur=encre)])
+        
+        # --- LISTE CRITÈRES FINE (police 8, interligne 4mm, min 5mm de haut) ---
+        criteres = [tableau.mesurer([Cellule(f"- {clean_text(skill)}", W_TEXT, interligne=4, taille=8)] + CASES_NOTES, hauteur_min=5)
+                    for skill in block['skills']]
+        
+        # L'entête ne reste jamais seul en bas de page
+        tableau.assurer(max(20, entete[0] + (criteres[0][0] if criteres else 0)))
+        tableau.dessiner(entete)
+        for mesure in criteres:
+            tableau.assurer(mesure[0])
+            tableau.dessiner(mesure)
+
+        # --- NON ÉVALUÉS ---
+        all_s = set(block['all_skills'])
+        selected_s = set(block['skills'])
+        not_evaluated = list(all_s - selected_s)
+        
+        if not_evaluated:
+            # Savoir-faire du référentiel : déjà convertis, on ne nettoie que les morceaux
+            missing_txt = ", ".join(clean_text(s) for s in sorted(not_evaluated))
+            # Police très petite (7), hauteur fine (4mm par ligne)
+            tableau.ligne([Cellule(f"Non evalue : {missing_txt}", 190, interligne=4, style='I', taille=7,
+                                   fond=(250, 250, 250), couleur=(100, 100, 100))])
+
+    # --- COMMENTAIRES ---
+    # On regarde s'il reste de la place en bas
+    space_left = 297 - 15 - pdf.get_y()
+    if space_left > 20: # S'il reste au moins 2cm
+        pdf.ln(3)
+        pdf.set_font('Arial', 'B', 9)
+        pdf.cell(0, 5, "Commentaires :", 0, 1)
+        # Le cadre prend toute la place restante (max 40mm pour pas être moche)
+        h_comments = min(space_left - 10, 40) 
+        pdf.rect(10, pdf.get_y(), 190, h_comments)
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
@@ -0,0 +1,124 @@
+from fpdf import FPDF
+
+from pedago.pdf_layout import Cellule, Tableau
+from pedago.texte import clean_text
+
+# --- FICHE DE PRÉPARATION PÉDAGOGIQUE (page 1) ---
+class PDF(FPDF):
+    def header(self):
+        self.set_font('Arial', 'B', 16)
+        self.cell(0, 10, 'Fiche de Preparation Pedagogique', 0, 1, 'C')
+        self.ln(5)
+
+    def section_title(self, label):
+        self.set_font('Arial', 'B', 12)
+        self.set_fill_color(230, 240, 255)
+        self.cell(0, 8, f"  {label}", 0, 1, 'L', 1)
+        self.ln(2)
+        
+    def check_space(self, height_needed):
+        if 297 - 15 - self.get_y() < height_needed:
+            self.add_page()
+
+def create_pdf(info, blocks, content):
+    pdf = PDF()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=True, margin=15)
+
+    if info.get('doc_id'):
+        pdf.set_font('Arial', 'B', 12)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(0, 5, clean_text(info['doc_id']), 0, 1, 'R')
+        pdf.ln(5)
+        pdf.set_text_color(0, 0, 0)
+
+    pdf.set_font('Arial', 'B', 16)
+    pdf.cell(0, 10, clean_text(info['title']), 0, 1, 'L')
+    
+    if info['seq'] or info['sea']:
+        pdf.set_font('Arial', 'B', 11)
+        pdf.set_text_color(80, 80, 80)
+        txt_seq = f"Sequence : {clean_text(info['seq'])}" if info['seq'] else ""
+        txt_sea = f"Seance : {clean_text(info['sea'])}" if info['sea'] else ""
+        sep = "  |  " if (txt_seq and txt_sea) else ""
+        pdf.cell(0, 6, f"{txt_seq}{sep}{txt_sea}", 0, 1, 'L')
+        pdf.set_text_color(0, 0, 0)
+        pdf.ln(2)
+
+    pdf.set_font('Arial', '', 10)
+    pdf.cell(60, 6, f"Date : {clean_text(str(info['date']))}", 0)
+    pdf.cell(60, 6, f"Classe : {clean_text(info['classe'])}", 0)
+    pdf.cell(60, 6, f"Duree : {clean_text(info['duration'])}", 0, 1)
+    pdf.ln(5)
+
+    if info['goal']:
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(0, 6, "Objectifs Pedagogiques :", 0, 1)
+        pdf.set_font('Arial', '', 10)
+        pdf.multi_cell(0, 5, clean_text(info['goal']))
+        pdf.ln(3)
+    
+    if info['desc']:
+        pdf.set_font('Arial', 'B', 10)
+        pdf.cell(0, 6, "Description / Contexte :", 0, 1)
+        pdf.set_font('Arial', '', 10)
+        pdf.multi_cell(0, 5, clean_text(info['desc']))
+        pdf.ln(5)
+
+    if blocks:
+        pdf.section_title("Competences & Activites")
+        tableau = Tableau(pdf)
+        for block in blocks:
+            dom_prefix = f"[{block.get('domain', '?')}] " if block.get('domain') else ""
+            act_label = block.get('label', '')
+            entete = tableau.mesurer([Cellule(f" {dom_prefix}Activite : {clean_text(act_label)}", interligne=8, style='B', taille=11,
+                                              fond=(220, 220, 220), couleur=(0, 50, 100))])
+            skills_text = "\n".join(f"- {clean_text(s)}" for s in block['skills'])
+            corps = tableau.mesurer([Cellule(clean_text(block['competence']), 60, interligne=6, style='I', taille=9),
+                                     Cellule(skills_text, interligne=6, taille=10)])
+            # L'activité ne se sépare pas de ses savoir-faire
+            tableau.assurer(max(40, entete[0] + corps[0]))
+            tableau.dessiner(entete)
+            tableau.dessiner(corps)
+            pdf.ln(4)
+        pdf.ln(2)
+
+    pdf.check_space(20)
+    pdf.section_title("Deroulement de la seance")
+    gris = (240, 240, 240)
+    entete = [Cellule("Duree", 20, align='C', style='B', fond=gris, multi=False),
+              Cellule("Phase", 40, align='C', style='B', fond=gris, multi=False),
+              Cellule("Consignes / Actions", align='C', style='B', fond=gris, multi=False)]
+    tableau = Tableau(pdf, entete=(entete, 8))
+    tableau.dessiner_entete()
+    for part in content:
+        desc = clean_text(part['desc']) if part['desc'] else "-"
+        tableau.ligne([Cellule(clean_text(part['duration']), 20, align='C', multi=False),
+                       Cellule(clean_text(part['title']), 40, multi=False),
+                       Cellule(desc, interligne=6)], hauteur_min=8)
+    
+    pdf.ln(5)
+
+    if blocks:
+        all_mat, all_pre, all_lie = set(), set(), set()
+        for block in blocks:
+            if block.get('materiel'): all_mat.update([x.strip() for x in block['materiel'].replace(';', ',').split(',') if x.strip()])
+            if block.get('prerequis'): all_pre.update([x.strip() for x in block['prerequis'].replace(';', ',').split(',') if x.strip()])
+            if block.get('liens'): all_lie.update([x.strip() for x in block['liens'].replace(';', ',').split(',') if x.strip()])
+
+        if all_mat or all_pre or all_lie:
+            pdf.check_space(50)
+            pdf.section_title("Ressources & Informations Complementaires")
+
+            def liste(items):
+                return "\n".join(f"- {clean_text(i)}" for i in sorted(items)) if items else "-"
+
+            w_col = 63
+            bleu = (230, 240, 255)
+            tableau = Tableau(pdf)
+            corps = tableau.mesurer([Cellule(liste(items), w_col, interligne=6) for items in (all_pre, all_mat, all_lie)])
+            tableau.ligne([Cellule(titre, w_col, align='C', style='B', taille=10, fond=bleu, multi=False)
+                           for titre in ("Pre-requis", "Materiel", "Liens Matieres")], hauteur_min=8, garder=corps[0])
+            tableau.dessiner(corps)
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
@@ -0,0 +1,126 @@
+from dataclasses import dataclass, replace
+
+# --- MISE EN PAGE DES TABLEAUX PDF ---
+# Chaque ligne est découpée une seule fois (split_only), sa hauteur en découle, puis chaque case
+# est dessinée une seule fois : un rectangle (fond + bordure) et ses lignes de texte.
+# Plus de multi_cell de mesure suivi d'un second multi_cell, ni de cadre vide redessiné par-dessus.
+
+@dataclass(frozen=True)
+class Cellule:
+    """Une case de tableau. texte déjà passé par clean_text ; largeur en mm (0 = jusqu'à la marge droite).
+
+    multi=True : texte découpé en lignes de hauteur interligne, calé en haut de la case.
+    multi=False : une seule ligne, centrée verticalement (comme cell()).
+    """
+    texte: str = ""
+    largeur: float = 0
+    interligne: float = 5
+    align: str = 'L'
+    style: str = ''
+    taille: float = 9
+    fond: tuple = None
+    couleur: tuple = (0, 0, 0)
+    multi: bool = True
+    bordure: bool = True
+
+class Tableau:
+    """Lignes de cases de hauteur commune, avec saut de page et en-tête répété.
+
+    bas : ordonnée (mm) à ne pas dépasser ; entete : (cellules, hauteur) redessinées en haut de chaque nouvelle page.
+    """
+
+    def __init__(self, pdf, bas=None, entete=None):
+        self.pdf = pdf
+        self.bas = bas if bas is not None else pdf.h - pdf.b_margin
+        self.entete = entete
+        self._haut_de_page = None
+
+    def mesurer(self, cellules, hauteur_min=0, marge=0):
+        """(hauteur de la ligne, [(cellule, x, largeur, lignes)]) : le seul découpage du texte"""
+        pdf = self.pdf
+        x = pdf.l_margin
+        placees, hauteur = [], hauteur_min
+        for cellule in cellules:
+            largeur = cellule.largeur or (pdf.w - pdf.r_margin - x)
+            lignes = None
+            if cellule.multi and cellule.texte:
+                pdf.set_font('Arial', cellule.style, cellule.taille)
+                lignes = pdf.multi_cell(largeur, cellule.interligne, cellule.texte, border=0, align='L', split_only=True)
+                hauteur = max(hauteur, len(lignes) * cellule.interligne + marge)
+            placees.append((cellule, x, largeur, lignes))
+            x += largeur
+        return hauteur, placees
+
+    def assurer(self, hauteur):
+        """Passe à la page suivante (avec l'en-tête) si hauteur mm ne tiennent plus sur la page"""
+        pdf = self.pdf
+        # Déjà en haut d'une page neuve : une ligne plus haute que la page sera coupée par dessiner()
+        if pdf.get_y() + hauteur > self.bas and (pdf.page, pdf.get_y()) != self._haut_de_page:
+            self._nouvelle_page()
+
+    def _nouvelle_page(self):
+        self.pdf.add_page()
+        if self.entete:
+            self.dessiner_entete()
+        self._haut_de_page = (self.pdf.page, self.pdf.get_y())
+
+    def dessiner_entete(self):
+        cellules, hauteur = self.entete
+        self._dessiner_morceau(*self.mesurer(cellules, hauteur_min=hauteur))
+
+    def dessiner(self, mesure):
+        """Dessine une ligne déjà mesurée à l'ordonnée courante, puis se place juste dessous.
+
+        Une ligne qui dépasse le bas de la page est coupée : les lignes de texte qui tiennent, cases
+        refermées, puis la suite sur la page suivante sous l'en-tête. Jamais rien sous le bas de page
+        (sinon le saut de page automatique de fpdf ouvrirait une page par ligne de texte).
+        """
+        pdf = self.pdf
+        hauteur, placees = mesure
+        total = 0
+        while pdf.get_y() + hauteur > self.bas:
+            # Un rien sous le bas : y + place ne doit pas le dépasser d'un arrondi (saut automatique de fpdf)
+            place = self.bas - pdf.get_y() - 1e-6
+            # Nombre de lignes de texte qui tiennent dans chaque case
+            coupes = [int(place // cellule.interligne) if lignes else 0 for cellule, _, _, lignes in placees]
+            if not any(coupes):
+                self._nouvelle_page()
+                continue
+            self._dessiner_morceau(place, [(cellule, x, largeur, lignes[:n] if lignes else lignes)
+                                           for (cellule, x, largeur, lignes), n in zip(placees, coupes)])
+            total += place
+            # La suite : lignes restantes, cases d'une seule ligne laissées vides (déjà écrites)
+            hauteur = max(hauteur - n * cellule.interligne for (cellule, _, _, lignes), n in zip(placees, coupes) if lignes)
+            placees = [(cellule, x, largeur, lignes[n:]) if lignes else (replace(cellule, texte=""), x, largeur, lignes)
+                       for (cellule, x, largeur, lignes), n in zip(placees, coupes)]
+            self._nouvelle_page()
+        return total + self._dessiner_morceau(hauteur, placees)
+
+    def _dessiner_morceau(self, hauteur, placees):
+        pdf = self.pdf
+        y = pdf.get_y()
+        for cellule, x, largeur, lignes in placees:
+            if cellule.fond:
+                pdf.set_fill_color(*cellule.fond)
+            if cellule.bordure or cellule.fond:
+                pdf.rect(x, y, largeur, hauteur, ('DF' if cellule.bordure else 'F') if cellule.fond else 'D')
+            if not cellule.texte:
+                continue
+            pdf.set_font('Arial', cellule.style, cellule.taille)
+            pdf.set_text_color(*cellule.couleur)
+            if lignes is None:
+                pdf.set_xy(x, y)
+                pdf.cell(largeur, hauteur, cellule.texte, 0, 0, cellule.align)
+            else:
+                for i, ligne in enumerate(lignes):
+                    pdf.set_xy(x, y + i * cellule.interligne)
+                    pdf.cell(largeur, cellule.interligne, ligne, 0, 0, cellule.align)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_xy(pdf.l_margin, y + hauteur)
+        return hauteur
+
+    def ligne(self, cellules, hauteur_min=0, marge=0, garder=0):
+        """Mesure, saute de page si besoin (en gardant garder mm pour la suite), dessine. Renvoie la hauteur."""
+        mesure = self.mesurer(cellules, hauteur_min, marge)
+        self.assurer(mesure[0] + garder)
+        return self.dessiner(mesure)
@@ -0,0 +1,88 @@
+from fpdf import FPDF
+
+from pedago.pdf_layout import Cellule, Tableau
+from pedago.texte import clean_text
+
+# --- FICHE SÉQUENCE (page 2) ---
+class PDFSeq(FPDF):
+    def header(self): pass 
+    def check_space(self, height):
+        if 297 - 10 - self.get_y() < height: self.add_page()
+
+def create_sequence_pdf(info, steps, skills_blocks):
+    pdf = PDFSeq()
+    pdf.add_page()
+    pdf.set_auto_page_break(auto=False)
+
+    # TITRE
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 8, clean_text(f"FICHE SEQUENCE {info['num']} : {info['title']}"), 0, 1, 'C')
+    
+    # INFOS
+    pdf.set_font('Arial', '', 9)
+    infos = f"Classe : {info['classe']}   |   Dates : {info['dates']}   |   Nb Seances : {len(steps)}"
+    pdf.cell(0, 6, clean_text(infos), "B", 1, 'C')
+    pdf.ln(3)
+
+    # --- BLOC OBJECTIFS & PROBLÉMATIQUE ---
+    bas = 297 - 10
+    tableau = Tableau(pdf, bas=bas)
+    tableau.ligne([Cellule(titre, 95, style='B', fond=(240, 240, 240), multi=False)
+                   for titre in ("Objectif Terminal :", "Problematique :")], hauteur_min=6)
+    tableau.ligne([Cellule(clean_text(info['obj']), 95, interligne=4, taille=8),
+                   Cellule(clean_text(info['prob']), 95, interligne=4, taille=8)], hauteur_min=8)
+    pdf.ln(3)
+
+    # --- COMPÉTENCES VISÉES (Mise en page améliorée) ---
+    if skills_blocks:
+        pdf.check_space(20)
+        tableau.ligne([Cellule(" Competences & Savoir-faire vises", style='B', taille=10, fond=(50, 50, 50),
+                               couleur=(255, 255, 255), multi=False)], hauteur_min=6)
+        
+        for block in skills_blocks:
+            # --- Partie 1 : En-tête Gris (Activité & Compétence) : [Domaine] Activité - Compétence ---
+            header_txt = f"[{clean_text(block['domain'])}] {clean_text(block['label'])} : {clean_text(block['competence'])}"
+            entete = tableau.mesurer([Cellule(header_txt, interligne=5, style='B', taille=8, fond=(235, 235, 235))])
+            
+            # --- Partie 2 : Liste des Savoir-faire (Blanc en dessous), séparés par des " / " pour gagner de la place ---
+            skills_str = " / ".join(clean_text(s) for s in block['skills'])
+            corps = tableau.mesurer([Cellule(f"Savoir-faire : {skills_str}", interligne=4, taille=8)])
+            
+            # L'entête reste sur la même page que ses savoir-faire
+            tableau.assurer(entete[0] + corps[0])
+            tableau.dessiner(entete)
+            tableau.dessiner(corps)
+            
+            # Petit espace après le bloc
+            pdf.ln(1)
+
+        pdf.ln(2)
+
+    # --- TABLEAU DÉROULÉ (en-tête répété sur chaque page) ---
+    w_type = 25
+    w_dur = 15
+    w_desc = 150
+    
+    noir, blanc = (50, 50, 50), (255, 255, 255)
+    entete = [Cellule("Type", w_type, align='C', style='B', fond=noir, couleur=blanc, multi=False),
+              Cellule("Contenu / Description", w_desc, align='C', style='B', fond=noir, couleur=blanc, multi=False),
+              Cellule("Duree", w_dur, align='C', style='B', fond=noir, couleur=blanc, multi=False)]
+    tableau = Tableau(pdf, bas=bas, entete=(entete, 6))
+    pdf.check_space(15)
+    tableau.dessiner_entete()
+
+    for step in steps:
+        if step['type'] == "Evaluation":
+            fond = (255, 240, 240)
+            type_label = f"EVAL {step['num']}"
+        else:
+            fond = (245, 250, 255)
+            type_label = f"SEANCE {step['num']}"
+
+        clean_desc = clean_text(f"{step['title']} : {step['desc']}")
+        tableau.ligne([Cellule(type_label, w_type, align='C', style='B', taille=8, fond=fond, multi=False),
+                       Cellule(clean_desc, w_desc, interligne=4, taille=8),
+                       Cellule(clean_text(step['duration']), w_dur, align='C', taille=8, multi=False)],
+                      hauteur_min=6, marge=2)
+
+    return pdf.output(dest='S').encode('latin-1', 'replace')
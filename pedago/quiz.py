@@ -0,0 +1,277 @@
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass
+
+import streamlit as st
+
+from pedago import db
+
+# --- BANQUE DE QUESTIONS DU QUIZ (tables quiz_*) ---
+# Les questions sont en base, par domaine et par poste, pour pouvoir en ajouter des milliers.
+# La page ne lit que les questions qu'elle affiche (sans les bonnes réponses) ; le corrigé est
+# compilé à part en tableaux numpy, une fois par version de la banque, et la correction d'une
+# copie comme d'une classe entière est un calcul vectoriel (aucune comparaison de chaînes).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quiz_postes (
+    id INTEGER PRIMARY KEY, domaine TEXT NOT NULL, libelle TEXT NOT NULL, rang INTEGER NOT NULL,
+    UNIQUE (domaine, libelle));
+CREATE TABLE IF NOT EXISTS quiz_questions (
+    id INTEGER PRIMARY KEY, poste_id INTEGER NOT NULL REFERENCES quiz_postes(id),
+    niveau TEXT NOT NULL, points INTEGER NOT NULL, rang INTEGER NOT NULL, question TEXT NOT NULL,
+    options TEXT NOT NULL, bonne_reponse INTEGER NOT NULL, actif INTEGER NOT NULL DEFAULT 1);
+CREATE INDEX IF NOT EXISTS idx_quiz_questions_poste ON quiz_questions (poste_id, actif, rang);
+CREATE TABLE IF NOT EXISTS quiz_versions (domaine TEXT PRIMARY KEY, version INTEGER NOT NULL);
+"""
+
+# Banque de départ (l'ancien QUIZ_DATA de la page), versée en base à la création des tables
+DOMAINE_INITIAL = "TIEE"
+QUIZ_DATA = {
+    "Chef Équipement Plateau Vert": [
+        {"niveau": "Débutant", "points": 1, "question": "Quel câble est utilisé pour relier une caméra standard à la grille vidéo ?", "options": ["XLR", "BNC (SDI)", "RJ45", "HDMI"], "reponse": "BNC (SDI)"},
+        {"niveau": "Intermédiaire", "points": 2, "question": "Lors de l'installation, quelle est la priorité absolue ?", "options": ["La propreté du plateau", "La sécurisation des câbles au sol (Gaffer)", "La rapidité", "L'esthétique"], "reponse": "La sécurisation des câbles au sol (Gaffer)"},
+        {"niveau": "Expert", "points": 3, "question": "Si une caméra ne reçoit pas de Genlock, quel est le symptôme visuel probable ?", "options": ["L'image est noire", "L'image saute ou 'roll'", "Les couleurs sont inversées", "Le son est désynchronisé"], "reponse": "L'image saute ou 'roll'"}
+    ],
+    "Truquiste Plateau Bleu": [
+        {"niveau": "Débutant", "points": 1, "question": "Quelle couleur est généralement utilisée pour l'incrustation (Chroma Key) ?", "options": ["Rouge", "Vert ou Bleu", "Blanc", "Noir"], "reponse": "Vert ou Bleu"},
+        {"niveau": "Intermédiaire", "points": 2, "question": "Sur un mélangeur, qu'est-ce qu'un DSK (Downstream Keyer) ?", "options": ["Une incrustation amont", "Une couche graphique finale", "Une transition", "Un réglage audio"], "reponse": "Une couche graphique finale"},
+        {"niveau": "Expert", "points": 3, "question": "Pour réussir une incrustation, quel élément est critique avant le mélangeur ?", "options": ["Le choix de la caméra", "L'éclairage uniforme du fond", "Le logiciel", "Le micro"], "reponse": "L'éclairage uniforme du fond"}
+    ],
+    "Sondier Plateau": [
+        {"niveau": "Débutant", "points": 1, "question": "Quel type de micro tient-on généralement à la main ?", "options": ["Cravate", "Micro main (dynamique)", "Canon", "Contact"], "reponse": "Micro main (dynamique)"},
+        {"niveau": "Intermédiaire", "points": 2, "question": "Qu'est-ce que l'alimentation fantôme (48V) ?", "options": ["Batterie de secours", "Pour les micros statiques", "Effet sonore", "Alimentation enceinte"], "reponse": "Pour les micros statiques"},
+        {"niveau": "Expert", "points": 3, "question": "Niveau de référence (Test Tone) standard en broadcast numérique (EBU) ?", "options": ["0 dBFS", "-9 dBFS", "-18 dBFS", "-10 dB"], "reponse": "-18 dBFS"}
+    ]
+}
+
+# (statut, priorité, conseil) : tout juste, au moins la moitié des points, moins de la moitié
+STATUTS = [
+    ("🟢 Maîtrisé", 3, "Excellent travail. Tu peux passer au rôle suivant ou aider tes camarades."),
+    ("🟠 En cours", 2, "Bon début. Relis les fiches techniques sur les points experts."),
+    ("🔴 Critique", 1, "⚠️ À retravailler d'urgence. Reprends les bases théoriques avant de manipuler."),
+]
+
+@dataclass(frozen=True)
+class Question:
+    """Ce que la page affiche d'une question (jamais la bonne réponse)"""
+    id: int
+    poste: str
+    niveau: str
+    points: int
+    question: str
+    options: tuple
+
+    @property
+    def intitule_niveau(self):
+        return f"{self.niveau} ({self.points}pt{'s' if self.points > 1 else ''})"
+
+@dataclass(frozen=True, eq=False)
+class Corrige:
+    """Corrigé compilé d'un domaine : tableaux numpy alignés sur ids (une case par question)"""
+    domaine: str
+    ids: object
+    bonnes: object
+    points: object
+    postes_idx: object
+    postes: tuple
+    max_par_poste: object
+
+    def colonnes(self):
+        """Question id -> colonne dans les tableaux de réponses"""
+        return {int(qid): j for j, qid in enumerate(self.ids)}
+
+# --- 1. SCHÉMA ET ÉCRITURE ---
+def ajouter_questions(conn, domaine, questions_par_poste):
+    """Ajoute des questions (format de QUIZ_DATA) à la fin de chaque poste, puis change la version du domaine"""
+    for poste, questions in questions_par_poste.items():
+        conn.execute('INSERT OR IGNORE INTO quiz_postes (domaine, libelle, rang) '
+                     'SELECT ?, ?, COUNT(*) FROM quiz_postes WHERE domaine = ?', (domaine, poste, domaine))
+        poste_id, = conn.execute('SELECT id FROM quiz_postes WHERE domaine = ? AND libelle = ?', (domaine, poste)).fetchone()
+        debut, = conn.execute('SELECT COUNT(*) FROM quiz_questions WHERE poste_id = ?', (poste_id,)).fetchone()
+        conn.executemany('''INSERT INTO quiz_questions (poste_id, niveau, points, rang, question, options, bonne_reponse)
+            VALUES (?, ?, ?, ?, ?, ?, ?)''', [
+            (poste_id, q['niveau'], int(q['points']), debut + i, q['question'], json.dumps(list(q['options']), ensure_ascii=False),
+             list(q['options']).index(q['reponse'])) for i, q in enumerate(questions)])
+    conn.execute('''INSERT INTO quiz_versions (domaine, version) VALUES (?, 1)
+        ON CONFLICT (domaine) DO UPDATE SET version = version + 1''', (domaine,))
+
+def _semer(conn):
+    if conn.execute('SELECT 1 FROM quiz_questions LIMIT 1').fetchone() is None:
+        ajouter_questions(conn, DOMAINE_INITIAL, QUIZ_DATA)
+
+def init_quiz_db():
+    db.ensure_schema('quiz', SCHEMA, migration=_semer)
+
+# --- 2. LECTURE (page) ---
+def domaines_disponibles():
+    init_quiz_db()
+    with db.connexion() as conn:
+        return [d for d, in conn.execute('''SELECT DISTINCT p.domaine FROM quiz_postes p
+            WHERE EXISTS (SELECT 1 FROM quiz_questions q WHERE q.poste_id = p.id AND q.actif = 1) ORDER BY p.domaine''')]
+
+def version(domaine):
+    init_quiz_db()
+    with db.connexion() as conn:
+        row = conn.execute('SELECT version FROM quiz_versions WHERE domaine = ?', (domaine,)).fetchone()
+    return row[0] if row else 0
+
+def _lignes(conn, domaine, colonnes):
+    return conn.execute(f'''SELECT {colonnes} FROM quiz_postes p
+        JOIN quiz_questions q ON q.poste_id = p.id AND q.actif = 1
+        WHERE p.domaine = ? ORDER BY p.rang, q.rang''', (domaine,)).fetchall()
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _charger_questions(domaine, version):
+    with db.connexion() as conn:
+        rows = _lignes(conn, domaine, 'q.id, p.libelle, q.niveau, q.points, q.question, q.options')
+    return tuple(Question(qid, poste, niveau, points, question, tuple(json.loads(options)))
+                 for qid, poste, niveau, points, question, options in rows)
+
+def charger_questions(domaine):
+    """Questions affichées pour un domaine, dans l'ordre des postes ; une lecture par version de la banque"""
+    return _charger_questions(domaine, version(domaine))
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _compiler(domaine, version):
+    import numpy as np
+    with db.connexion() as conn:
+        rows = _lignes(conn, domaine, 'q.id, p.libelle, q.points, q.bonne_reponse')
+    postes = tuple(dict.fromkeys(poste for _, poste, _, _ in rows))
+    rang_poste = {poste: i for i, poste in enumerate(postes)}
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    postes_idx = np.fromiter((rang_poste[r[1]] for r in rows), dtype=np.intp, count=len(rows))
+    points = np.fromiter((r[2] for r in rows), dtype=np.int64, count=len(rows))
+    bonnes = np.fromiter((r[3] for r in rows), dtype=np.int16, count=len(rows))
+    max_par_poste = np.bincount(postes_idx, weights=points, minlength=len(postes)).astype(np.int64)
+    return Corrige(domaine, ids, bonnes, points, postes_idx, postes, max_par_poste)
+
+def corrige(domaine):
+    """Corrigé compilé du domaine (mis en cache par version de la banque)"""
+    return _compiler(domaine, version(domaine))
+
+# --- 3. CORRECTION VECTORIELLE ---
+def tableau_reponses(corrige, copies):
+    """copies : liste de {question id: indice de l'option choisie ou None} -> matrice (copies x questions), -1 = sans réponse"""
+    import numpy as np
+    colonnes = corrige.colonnes()
+    choix = np.full((len(copies), len(corrige.ids)), -1, dtype=np.int16)
+    for i, reponses in enumerate(copies):
+        for qid, option in reponses.items():
+            if option is not None and qid in colonnes:
+                choix[i, colonnes[qid]] = option
+    return choix
+
+def noter(corrige, choix):
+    """Scores (copies x postes) : bonnes réponses pondérées par les points, sommées par poste"""
+    import numpy as np
+    choix = np.atleast_2d(choix)
+    gagnes = (choix == corrige.bonnes) * corrige.points
+    # Matrice questions x postes (1 si la question appartient au poste) : un seul produit matriciel pour toute la classe
+    appartenance = np.zeros((len(corrige.ids), len(corrige.postes)), dtype=np.int64)
+    appartenance[np.arange(len(corrige.ids)), corrige.postes_idx] = 1
+    return gagnes @ appartenance
+
+def resultats(corrige, scores):
+    """Tableau « à plat » (une ligne par copie et par poste) : copie, Poste, Score, Max, Pourcentage, Statut, Conseil, Priorite"""
+    import numpy as np
+    import pandas as pd
+    scores = np.atleast_2d(scores)
+    n_copies, n_postes = scores.shape
+    score = scores.ravel()
+    maxi = np.tile(corrige.max_par_poste, n_copies)
+    niveau = np.select([score == maxi, score >= maxi / 2], [0, 1], default=2)
+    statuts, priorites, conseils = (np.array(col, dtype=object) for col in zip(*STATUTS))
+    return pd.DataFrame({
+        "copie": np.repeat(np.arange(n_copies), n_postes), "Poste": np.tile(np.array(corrige.postes, dtype=object), n_copies),
+        "Score": score, "Max": maxi, "Pourcentage": np.round(score / np.maximum(maxi, 1) * 100, 1),
+        "Statut": statuts[niveau], "Conseil": conseils[niveau], "Priorite": priorites[niveau].astype(int),
+    })
+
+def corriger_copie(corrige, reponses):
+    """Résultats d'une copie ({question id: indice choisi ou None}) : une ligne par poste"""
+    return resultats(corrige, noter(corrige, tableau_reponses(corrige, [reponses]))).drop(columns="copie")
+
+# --- 4. IMPORT DES COPIES D'UNE CLASSE (CSV / XLSX) ---
+# Une ligne par élève : nom, prenom, classe (facultative), puis une colonne par question dont l'en-tête
+# commence par q<id> (voir modele_import). Réponse : lettre (A, B...), numéro (1, 2...) ou texte exact
+# de l'option ; case vide = sans réponse.
+COLONNES_IDENTITE = ['nom', 'prenom', 'classe']
+EN_TETE_QUESTION = re.compile(r'^q(\d+)\b', re.IGNORECASE)
+
+@dataclass(frozen=True, eq=False)
+class Copies:
+    """Copies importées : identites (DataFrame nom, prenom, classe), choix (matrice copies x questions, -1 = sans réponse).
+
+    inconnues : réponses non reconnues ou ambiguës, comptées sans réponse.
+    """
+    identites: object
+    choix: object
+    inconnues: int
+
+def modele_import(domaine):
+    """CSV (séparateur ;) à remplir : colonnes d'identité puis une colonne par question du domaine"""
+    sortie = io.StringIO()
+    writer = csv.writer(sortie, delimiter=';')
+    questions = charger_questions(domaine)
+    writer.writerow(COLONNES_IDENTITE + [f"q{q.id} {q.poste} - {q.niveau}" for q in questions])
+    writer.writerow(['Exemple', 'Eleve', domaine] + ['A' for _ in questions])
+    return sortie.getvalue().encode('utf-8-sig')
+
+def lire_copies(fichier, corrige, classe=None):
+    """Lit un fichier de réponses (CSV ou XLSX) et décode toutes les réponses d'une colonne à la fois.
+
+    classe : utilisée si le fichier n'a pas de colonne classe. ValueError si le fichier ne correspond pas au quiz.
+    """
+    import numpy as np
+    import pandas as pd
+    if getattr(fichier, 'name', '').lower().endswith(('.xlsx', '.xlsm')):
+        df = pd.read_excel(fichier, dtype=str, engine='openpyxl')
+    else:
+        df = pd.read_csv(fichier, dtype=str, sep=None, engine='python', encoding='utf-8-sig')
+    df = df.rename(columns=lambda c: str(c).strip())
+    df = df.rename(columns={c: c.lower() for c in df.columns if c.lower() in COLONNES_IDENTITE})
+    if 'classe' not in df.columns and classe:
+        df['classe'] = classe
+    manquantes = [c for c in COLONNES_IDENTITE if c not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonnes manquantes : {', '.join(manquantes)}")
+    df = df.fillna('')
+    df = df[(df['nom'].str.strip() != '') | (df['prenom'].str.strip() != '')].reset_index(drop=True)
+
+    colonnes = corrige.colonnes()
+    questions = {q.id: q for q in charger_questions(corrige.domaine)}
+    en_tetes = {c: int(m.group(1)) for c in df.columns if (m := EN_TETE_QUESTION.match(c))}
+    if not en_tetes:
+        raise ValueError("Aucune colonne de question (en-têtes q<numéro>) : partez du modèle à télécharger")
+    inconnues_q = sorted(qid for qid in en_tetes.values() if qid not in colonnes)
+    if inconnues_q:
+        raise ValueError(f"Questions absentes du quiz {corrige.domaine} : {', '.join(f'q{qid}' for qid in inconnues_q)}")
+
+    choix = np.full((len(df), len(corrige.ids)), -1, dtype=np.int16)
+    inconnues = 0
+    for col, qid in en_tetes.items():
+        # Texte exact de l'option d'abord, puis lettre ou numéro ; une table par colonne (toute la classe)
+        textes, doublons = {}, set()
+        for k, option in enumerate(questions[qid].options):
+            cle = option.strip().casefold()
+            if cle in textes:
+                doublons.add(cle)
+            textes[cle] = k
+        lettres_numeros = {code: k for k in range(len(questions[qid].options)) for code in (chr(ord('a') + k), str(k + 1))}
+        valeurs = df[col].str.strip().str.casefold()
+        # « 2.0 » : nombre entier écrit en décimal (export tableur) ; les autres textes ne sont jamais retouchés
+        entiers = valeurs.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+        par_texte = valeurs.map(textes).fillna(entiers.map(textes))
+        par_code = entiers.map(lettres_numeros)
+        # Ambiguës (texte partagé par deux options, ou texte d'une option et code d'une autre) : comptées inconnues
+        ambigues = valeurs.isin(doublons) | entiers.isin(doublons) | (par_texte.notna() & par_code.notna() & (par_texte != par_code))
+        codes = par_texte.fillna(par_code).mask(ambigues)
+        inconnues += int((codes.isna() & (valeurs != '')).sum())
+        choix[:, colonnes[qid]] = codes.fillna(-1).to_numpy(dtype=np.int16)
+    identites = df[COLONNES_IDENTITE].apply(lambda col: col.str.strip())
+    return Copies(identites, choix, inconnues)
+
+def corriger_copies(corrige, copies):
+    """Toute la classe en un passage : tableau « à plat » avec l'identité de chaque copie"""
+    return resultats(corrige, noter(corrige, copies.choix)).join(copies.identites, on='copie')
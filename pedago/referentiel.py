@@ -0,0 +1,495 @@
+import codecs
+import csv
+import glob
+import hashlib
+import io
+import os
+import re
+import tempfile
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping
+
+import streamlit as st
+
+from pedago import config, db, texte
+
+# --- 1. FORMAT DES CSV ---
+RENAME_MAP = {
+    'pré-requis': 'prerequis', 'pre-requis': 'prerequis',
+    'matériel': 'materiel', 'lien': 'liens', 'liens matières': 'liens',
+    'categorie': 'base', 'domaine': 'base'
+}
+REQUIRED_COLUMNS = ['competence', 'skill', 'label', 'prerequis', 'materiel', 'liens']
+SEPARATEURS = ',;\t|'
+# Tabulation (et blancs autour) à l'intérieur d'une cellule : "C5\tSélectionner" -> "C5 Sélectionner"
+TABULATION = re.compile(r'\s*\t\s*')
+# Version de la lecture des CSV (normalisation, colonnes...) : l'augmenter force une relecture
+VERSION_LECTURE = 2
+
+# Dernière signature (mtime, taille) vue par ce processus : si rien n'a bougé sur le disque,
+# on ne relit ni les CSV ni la base.
+_lock = threading.Lock()
+_signature_connue = None
+_version_connue = None
+
+# --- 2. EMPREINTE DES FICHIERS SOURCES ---
+def find_csv(domaine):
+    """Cherche le vrai chemin du CSV d'un domaine (gestion majuscules/minuscules pour Linux)"""
+    target_filename = config.CSV_FILES[domaine]
+    target = os.path.join(config.DATA_DIR, target_filename)
+    if os.path.exists(target):
+        return target
+    try:
+        files_on_disk = os.listdir(config.DATA_DIR)
+    except FileNotFoundError:
+        print(f"Dossier introuvable : {config.DATA_DIR}")
+        return None
+    for f in files_on_disk:
+        if f.lower() == target_filename.lower():
+            return os.path.join(config.DATA_DIR, f)
+    return None
+
+def _signature_disque():
+    """(domaine, chemin, mtime_ns, taille) pour chaque CSV : un simple stat, aucune lecture"""
+    signature = []
+    for domaine in config.CSV_FILES:
+        path = find_csv(domaine)
+        try:
+            st_res = os.stat(path) if path else None
+        except OSError:
+            st_res = None
+        if st_res is None:
+            signature.append((domaine, None, None, None))
+        else:
+            signature.append((domaine, path, st_res.st_mtime_ns, st_res.st_size))
+    return tuple(signature)
+
+def _hash_fichier(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _version(empreintes):
+    """Version globale du référentiel = hash des contenus des trois CSV"""
+    h = hashlib.sha256()
+    h.update(f"lecture:{VERSION_LECTURE};".encode('utf-8'))
+    for domaine, digest in sorted(empreintes.items()):
+        h.update(f"{domaine}:{digest or '-'};".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+# Référentiel normalisé : une seule copie des CSV, clés entières, index par domaine
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS referentiel_sources (
+    domaine TEXT PRIMARY KEY, chemin TEXT, mtime_ns INTEGER, taille INTEGER, sha256 TEXT,
+    separateur TEXT, encodage TEXT, lecture INTEGER);
+CREATE TABLE IF NOT EXISTS ref_domaines (
+    id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE);
+CREATE TABLE IF NOT EXISTS ref_competences (
+    id INTEGER PRIMARY KEY, domaine_id INTEGER NOT NULL REFERENCES ref_domaines(id), libelle TEXT NOT NULL,
+    UNIQUE (domaine_id, libelle));
+CREATE TABLE IF NOT EXISTS ref_labels (
+    id INTEGER PRIMARY KEY, domaine_id INTEGER NOT NULL REFERENCES ref_domaines(id),
+    competence_id INTEGER NOT NULL REFERENCES ref_competences(id), libelle TEXT NOT NULL,
+    rang INTEGER NOT NULL DEFAULT 0, actif INTEGER NOT NULL DEFAULT 1);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ref_labels_domaine_label ON ref_labels (domaine_id, libelle);
+CREATE TABLE IF NOT EXISTS ref_skills (
+    id INTEGER PRIMARY KEY, domaine_id INTEGER NOT NULL REFERENCES ref_domaines(id),
+    competence_id INTEGER NOT NULL REFERENCES ref_competences(id), libelle TEXT NOT NULL,
+    actif INTEGER NOT NULL DEFAULT 1);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ref_skills_domaine_skill ON ref_skills (domaine_id, libelle);
+CREATE TABLE IF NOT EXISTS ref_label_skills (
+    label_id INTEGER NOT NULL REFERENCES ref_labels(id), skill_id INTEGER NOT NULL REFERENCES ref_skills(id),
+    rang INTEGER NOT NULL, PRIMARY KEY (label_id, skill_id)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ref_options (
+    domaine_id INTEGER NOT NULL REFERENCES ref_domaines(id), categorie TEXT NOT NULL, valeur TEXT NOT NULL,
+    PRIMARY KEY (domaine_id, categorie, valeur)) WITHOUT ROWID;
+"""
+
+# Anciennes copies du référentiel (une par page + une par CSV), remplacées par les tables ref_*
+LEGACY_TABLES = ['competences', 'competences_seq', 'competences_eval', 'tiee', 'image', 'montage']
+OPTION_COLUMNS = ['prerequis', 'materiel', 'liens']
+
+def _migrer_sources(conn):
+    """Bases antérieures au dialecte enregistré : ajout des colonnes (lecture NULL = CSV à relire)"""
+    colonnes = {row[1] for row in conn.execute('PRAGMA table_info(referentiel_sources)')}
+    for col, type_sql in (('separateur', 'TEXT'), ('encodage', 'TEXT'), ('lecture', 'INTEGER')):
+        if col not in colonnes:
+            conn.execute(f'ALTER TABLE referentiel_sources ADD COLUMN {col} {type_sql}')
+
+def _lire_empreintes(conn):
+    rows = conn.execute('''SELECT domaine, chemin, mtime_ns, taille, sha256, separateur, encodage, lecture
+        FROM referentiel_sources''').fetchall()
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+def _detecter_dialecte(path):
+    """(séparateur, encodage) d'un CSV, déduits de la seule ligne d'en-tête.
+
+    Les cellules mélangent tabulations et virgules ("C5\tSélectionner, ...") : les inclure fausserait la détection.
+    """
+    with open(path, 'rb') as f:
+        entete = f.readline()
+    encodage = 'utf-8-sig' if entete.startswith(codecs.BOM_UTF8) else 'utf-8'
+    try:
+        separateur = csv.Sniffer().sniff(entete.decode(encodage, errors='replace'), delimiters=SEPARATEURS).delimiter
+    except csv.Error:
+        separateur = ','
+    return separateur, encodage
+
+def _comparer(signature, stockees):
+    """Renvoie (nouvelles empreintes, contenu modifié ?, empreintes à réécrire ?)
+
+    Une empreinte = (chemin, mtime_ns, taille, sha256, séparateur, encodage, version de lecture).
+    """
+    nouvelles = {}
+    contenu_modifie = set(stockees) != {dom for dom, path, _, _ in signature if path}
+    for domaine, path, mtime, taille in signature:
+        if path is None:
+            continue
+        old = stockees.get(domaine)
+        if old and old[6] != VERSION_LECTURE:
+            # CSV lus par une version précédente : on relit tout
+            old, contenu_modifie = None, True
+        if old and old[:3] == (path, mtime, taille):
+            # Même chemin, même date, même taille : on fait confiance au hash et au dialecte déjà calculés
+            nouvelles[domaine] = old
+            continue
+        digest = _hash_fichier(path)
+        if old and old[3] == digest:
+            separateur, encodage = old[4], old[5]
+        else:
+            contenu_modifie = True
+            separateur, encodage = _detecter_dialecte(path)
+        nouvelles[domaine] = (path, mtime, taille, digest, separateur, encodage, VERSION_LECTURE)
+    return nouvelles, contenu_modifie, nouvelles != stockees
+
+def normaliser(texte):
+    """Texte d'une cellule tel que stocké dans le référentiel : tabulations -> espace, blancs de bord retirés.
+
+    Appliqué aussi aux textes venus d'ailleurs (ancien historique, fiches) avant de les chercher dans ref_*.
+    """
+    if not texte:
+        return ''
+    if '\t' in texte:
+        texte = TABULATION.sub(' ', texte)
+    return texte.strip()
+
+# --- 3. CONSTRUCTION DU RÉFÉRENTIEL ---
+# pandas n'est importé qu'ici : quand les CSV n'ont pas changé, le référentiel est servi par la base seule.
+def _lire_csv(domaine, source, separateur, encodage):
+    """Lecture par le moteur C (séparateur connu d'avance), colonnes et cellules normalisées"""
+    import pandas as pd
+    df = pd.read_csv(source, sep=separateur, engine='c', encoding=encodage, dtype=str, keep_default_na=False)
+    df.columns = df.columns.str.strip().str.lower()
+    df.rename(columns=RENAME_MAP, inplace=True)
+    for col in REQUIRED_COLUMNS:
+        if col not in df.columns: df[col] = ""
+    # Même règle que normaliser(), vectorisée (l'expression régulière seulement sur les colonnes concernées)
+    df = df[REQUIRED_COLUMNS].apply(lambda col: (col.str.replace(TABULATION, ' ', regex=True)
+                                                 if col.str.contains('\t', regex=False).any() else col).str.strip())
+    df.insert(0, 'domaine', domaine)
+    return df
+
+def _chemin_instantane(domaine, digest):
+    import pandas as pd
+    return os.path.join(config.CACHE_DIR, f"referentiel_{domaine.lower()}_{digest[:16]}_v{VERSION_LECTURE}_pd{pd.__version__}.pkl")
+
+def _ecrire_instantane(domaine, path, df):
+    """Écriture atomique (fichier temporaire puis renommage) ; les instantanés périmés du domaine sont supprimés"""
+    tmp = None
+    try:
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=config.CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            df.to_pickle(f)
+        for ancien in glob.glob(os.path.join(config.CACHE_DIR, f"referentiel_{domaine.lower()}_*.pkl")):
+            if ancien != path:
+                os.remove(ancien)
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Instantané non écrit ({path}) : {e}")
+        if tmp and os.path.exists(tmp):
+            os.remove(tmp)
+
+def charger_csv(domaine, empreinte):
+    """DataFrame normalisé d'un CSV : relu depuis l'instantané binaire (clé = sha256 + version de pandas)
+    s'il existe, sinon analysé une fois puis enregistré pour les chargements suivants."""
+    import pandas as pd
+    path, _, _, digest, separateur, encodage, _ = empreinte
+    instantane = _chemin_instantane(domaine, digest)
+    try:
+        return pd.read_pickle(instantane)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Instantané illisible ({instantane}) : {e}")
+    with open(path, 'rb') as f:
+        contenu = f.read()
+    df = _lire_csv(domaine, io.BytesIO(contenu), separateur, encodage)
+    # Fichier modifié depuis le calcul de l'empreinte : on n'enregistre pas un instantané sous une clé fausse
+    if hashlib.sha256(contenu).hexdigest() == digest:
+        _ecrire_instantane(domaine, instantane, df)
+    return df
+
+def split_options(raw):
+    """'a; b, c' -> ['a', 'b', 'c']"""
+    return [p.strip() for p in raw.replace(';', ',').split(',') if p.strip()]
+
+def _positions(rows):
+    """Position de chaque savoir-faire = rang de son premier couple (activité, savoir-faire) dans le CSV"""
+    positions = {}
+    for rang, (_, skill) in enumerate(dict.fromkeys((label, skill) for _, skill, label in rows)):
+        positions.setdefault(skill, rang)
+    return positions
+
+def _detecter_renommages(conn, dom_id, rows, skills):
+    """Un savoir-faire dont seul le libellé change (même position dans le CSV) garde son identifiant.
+
+    L'historique pointe sur les identifiants : une correction de libellé ne lui fait pas perdre la trace.
+    """
+    connus = {libelle for (libelle,) in conn.execute('SELECT libelle FROM ref_skills WHERE domaine_id = ?', (dom_id,))}
+    anciens = {rang: (skill_id, libelle) for skill_id, libelle, rang in conn.execute('''SELECT s.id, s.libelle, MIN(ls.rang)
+        FROM ref_skills s JOIN ref_label_skills ls ON ls.skill_id = s.id
+        WHERE s.domaine_id = ? AND s.actif = 1 GROUP BY s.id''', (dom_id,))}
+    for skill, rang in _positions(rows).items():
+        if skill in connus or rang not in anciens:
+            continue
+        skill_id, ancien = anciens[rang]
+        if ancien not in skills:
+            conn.execute('UPDATE ref_skills SET libelle = ? WHERE id = ?', (skill, skill_id))
+            connus.add(skill)
+
+def _ecrire_domaine(conn, domaine, df):
+    """Met à jour un domaine en conservant les identifiants des lignes déjà connues"""
+    conn.execute('INSERT INTO ref_domaines (code) VALUES (?) ON CONFLICT (code) DO NOTHING', (domaine,))
+    dom_id = conn.execute('SELECT id FROM ref_domaines WHERE code = ?', (domaine,)).fetchone()[0]
+    rows = list(df[['competence', 'skill', 'label']].itertuples(index=False, name=None))
+
+    conn.executemany('INSERT INTO ref_competences (domaine_id, libelle) VALUES (?, ?) ON CONFLICT DO NOTHING',
+                     [(dom_id, comp) for comp in dict.fromkeys(r[0] for r in rows)])
+    comp_ids = dict(conn.execute('SELECT libelle, id FROM ref_competences WHERE domaine_id = ?', (dom_id,)))
+
+    # Activités : la compétence officielle est celle de la première ligne rencontrée
+    labels = {}
+    for comp, _, label in rows:
+        labels.setdefault(label, comp_ids[comp])
+    conn.execute('UPDATE ref_labels SET actif = 0 WHERE domaine_id = ?', (dom_id,))
+    conn.executemany('''INSERT INTO ref_labels (domaine_id, competence_id, libelle, rang, actif) VALUES (?, ?, ?, ?, 1)
+        ON CONFLICT (domaine_id, libelle) DO UPDATE SET competence_id = excluded.competence_id, rang = excluded.rang, actif = 1''',
+        [(dom_id, comp_id, label, rang) for rang, (label, comp_id) in enumerate(labels.items())])
+    label_ids = dict(conn.execute('SELECT libelle, id FROM ref_labels WHERE domaine_id = ?', (dom_id,)))
+
+    skills = {}
+    for comp, skill, _ in rows:
+        skills.setdefault(skill, comp_ids[comp])
+    _detecter_renommages(conn, dom_id, rows, skills)
+    conn.execute('UPDATE ref_skills SET actif = 0 WHERE domaine_id = ?', (dom_id,))
+    conn.executemany('''INSERT INTO ref_skills (domaine_id, competence_id, libelle, actif) VALUES (?, ?, ?, 1)
+        ON CONFLICT (domaine_id, libelle) DO UPDATE SET competence_id = excluded.competence_id, actif = 1''',
+        [(dom_id, comp_id, skill) for skill, comp_id in skills.items()])
+    skill_ids = dict(conn.execute('SELECT libelle, id FROM ref_skills WHERE domaine_id = ?', (dom_id,)))
+
+    conn.execute('DELETE FROM ref_label_skills WHERE label_id IN (SELECT id FROM ref_labels WHERE domaine_id = ?)', (dom_id,))
+    links = dict.fromkeys((label_ids[label], skill_ids[skill]) for _, skill, label in rows)
+    conn.executemany('INSERT INTO ref_label_skills (label_id, skill_id, rang) VALUES (?, ?, ?)',
+                     [(label_id, skill_id, rang) for rang, (label_id, skill_id) in enumerate(links)])
+
+    conn.execute('DELETE FROM ref_options WHERE domaine_id = ?', (dom_id,))
+    options = {(col, p) for col in OPTION_COLUMNS for item in df[col] for p in split_options(item)}
+    # Toutes les compétences du CSV (pas seulement celles qui portent une activité) : liste de l'assistant IA
+    options.update(('competence', comp) for comp in df['competence'] if comp)
+    conn.executemany('INSERT INTO ref_options (domaine_id, categorie, valeur) VALUES (?, ?, ?)',
+                     [(dom_id, col, valeur) for col, valeur in options])
+
+def _reconstruire(conn, empreintes):
+    all_data = {}
+    for domaine, empreinte in empreintes.items():
+        try:
+            all_data[domaine] = charger_csv(domaine, empreinte)
+        except Exception as e:
+            print(f"Erreur lecture {empreinte[0]}: {e}")
+    for domaine in config.CSV_FILES:
+        if domaine not in empreintes:
+            print(f"⚠️ Fichier introuvable pour {domaine} (Cherché: {config.CSV_FILES[domaine]})")
+    if not all_data:
+        return
+    for domaine, df in all_data.items():
+        _ecrire_domaine(conn, domaine, df)
+    # Un domaine dont le CSV a disparu n'est plus proposé (ses lignes restent pour l'historique)
+    absents = [dom for (dom,) in conn.execute('SELECT code FROM ref_domaines') if dom not in all_data]
+    for domaine in absents:
+        conn.execute('UPDATE ref_labels SET actif = 0 WHERE domaine_id = (SELECT id FROM ref_domaines WHERE code = ?)', (domaine,))
+        conn.execute('UPDATE ref_skills SET actif = 0 WHERE domaine_id = (SELECT id FROM ref_domaines WHERE code = ?)', (domaine,))
+        conn.execute('DELETE FROM ref_options WHERE domaine_id = (SELECT id FROM ref_domaines WHERE code = ?)', (domaine,))
+
+def init_schema():
+    """Crée les tables du référentiel si besoin (pour les modules qui y font référence)"""
+    db.ensure_schema('referentiel', SCHEMA, migration=_migrer_sources)
+
+def _libelles_normalises(conn):
+    """Texte normalisé -> [(domaine, identifiant)] de tous les savoir-faire, lignes actives d'abord"""
+    libelles = {}
+    for skill_id, code, libelle in conn.execute('''SELECT s.id, d.code, s.libelle
+            FROM ref_skills s JOIN ref_domaines d ON d.id = s.domaine_id ORDER BY s.actif DESC, s.id'''):
+        libelles.setdefault(normaliser(libelle), []).append((code, skill_id))
+    return libelles
+
+def _rechercher(libelles, domaine, skill):
+    """Même domaine en priorité, sinon le savoir-faire rangé ailleurs (ancien historique sans domaine)"""
+    candidats = libelles.get(skill, [])
+    for code, skill_id in candidats:
+        if code == domaine:
+            return skill_id
+    return candidats[0][1] if candidats else None
+
+def resolve_skill_ids(conn, triples, absents=None):
+    """(domaine, compétence, savoir-faire) -> identifiant ref_skills, par recherche indexée.
+
+    Les textes sont normalisés comme les cellules des CSV avant la recherche ; les clés du résultat restent
+    les couples (domaine, savoir-faire) tels que reçus. Si le texte exact manque, il est comparé au texte
+    normalisé de tous les savoir-faire connus (libellés enregistrés avant normalisation, autre domaine).
+    Seul un savoir-faire absent de tout le référentiel (CSV modifié depuis) est conservé comme ligne inactive,
+    pour ne jamais perdre une entrée d'historique : il est signalé et ajouté à absents si la liste est fournie.
+    """
+    ids = {}
+    libelles = None
+    for domaine_brut, comp_brute, skill_brut in triples:
+        if (domaine_brut, skill_brut) in ids:
+            continue
+        domaine, comp, skill = normaliser(domaine_brut), normaliser(comp_brute), normaliser(skill_brut)
+        row = conn.execute('''SELECT s.id FROM ref_skills s JOIN ref_domaines d ON d.id = s.domaine_id
+            WHERE d.code = ? AND s.libelle = ?''', (domaine, skill)).fetchone()
+        if row is None:
+            # Table relue une seule fois par appel, au premier texte introuvable
+            if libelles is None:
+                libelles = _libelles_normalises(conn)
+            skill_id = _rechercher(libelles, domaine, skill)
+            row = (skill_id,) if skill_id is not None else None
+        if row is None:
+            conn.execute('INSERT INTO ref_domaines (code) VALUES (?) ON CONFLICT (code) DO NOTHING', (domaine,))
+            dom_id = conn.execute('SELECT id FROM ref_domaines WHERE code = ?', (domaine,)).fetchone()[0]
+            conn.execute('INSERT INTO ref_competences (domaine_id, libelle) VALUES (?, ?) ON CONFLICT DO NOTHING', (dom_id, comp))
+            comp_id = conn.execute('SELECT id FROM ref_competences WHERE domaine_id = ? AND libelle = ?', (dom_id, comp)).fetchone()[0]
+            row = conn.execute('INSERT INTO ref_skills (domaine_id, competence_id, libelle, actif) VALUES (?, ?, ?, 0) RETURNING id',
+                               (dom_id, comp_id, skill)).fetchone()
+            libelles.setdefault(skill, []).append((domaine, row[0]))
+            print(f"⚠️ Savoir-faire absent du référentiel, conservé inactif : {domaine} / {skill}")
+            if absents is not None:
+                absents.append((domaine, skill))
+        ids[(domaine_brut, skill_brut)] = row[0]
+    return ids
+
+def _supprimer_anciennes_tables(conn):
+    """Supprime les copies historiques du référentiel ; renvoie True si la base a maigri"""
+    anciennes = [t for t in LEGACY_TABLES if db.table_existe(conn, t)]
+    for table in anciennes:
+        conn.execute(f'DROP TABLE {table}')
+    return bool(anciennes)
+
+def _ecrire_empreintes(conn, empreintes):
+    conn.execute('DELETE FROM referentiel_sources')
+    conn.executemany('''INSERT INTO referentiel_sources (domaine, chemin, mtime_ns, taille, sha256, separateur, encodage, lecture)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', [(dom,) + values for dom, values in empreintes.items()])
+
+def init_db(force=False):
+    """Met à jour le référentiel (tables ref_*) uniquement si un CSV a changé. Renvoie la version du référentiel.
+
+    Le chemin rapide (aucun fichier touché depuis le dernier appel) ne fait qu'un stat par CSV :
+    ni lecture de fichier, ni accès à pedago.db.
+    """
+    global _signature_connue, _version_connue
+    signature = _signature_disque()
+    with _lock:
+        if not force and signature == _signature_connue:
+            return _version_connue
+
+        init_schema()
+        with db.connexion() as conn:
+            empreintes, modifie, a_ecrire = _comparer(signature, _lire_empreintes(conn))
+            vide = conn.execute('SELECT 1 FROM ref_domaines LIMIT 1').fetchone() is None
+            anciennes = any(db.table_existe(conn, t) for t in LEGACY_TABLES)
+
+        if modifie or force or vide or a_ecrire or anciennes:
+            # Verrou d'écriture, puis nouvelle comparaison : un autre processus a pu reconstruire entre-temps
+            with db.transaction() as conn:
+                empreintes, modifie, a_ecrire = _comparer(signature, _lire_empreintes(conn))
+                vide = conn.execute('SELECT 1 FROM ref_domaines LIMIT 1').fetchone() is None
+                if modifie or force or vide:
+                    _reconstruire(conn, empreintes)
+                if a_ecrire:
+                    _ecrire_empreintes(conn, empreintes)
+                anciennes = _supprimer_anciennes_tables(conn)
+            if anciennes:
+                # Migration : on rend au disque la place des cinq copies supprimées
+                with db.connexion() as conn:
+                    conn.execute('VACUUM')
+
+        _signature_connue = signature
+        _version_connue = _version({dom: values[3] for dom, values in empreintes.items()})
+        return _version_connue
+
+# --- 4. INDEX EN MÉMOIRE (PARTAGÉ PAR TOUTES LES SESSIONS) ---
+@dataclass(frozen=True)
+class Activite:
+    official_name: str
+    skills: tuple
+
+@dataclass(frozen=True)
+class DomaineIndex:
+    """Vue figée d'un domaine : activité -> compétence et savoir-faire, options déjà découpées"""
+    domaine: str
+    labels: Mapping[str, Activite]
+    competences: tuple
+    prerequis: tuple
+    materiel: tuple
+    liens: tuple
+
+def _lire_index(conn, selected_domain):
+    rows = conn.execute('''SELECT l.libelle, c.libelle, s.libelle
+        FROM ref_domaines d
+        JOIN ref_labels l ON l.domaine_id = d.id AND l.actif = 1
+        JOIN ref_competences c ON c.id = l.competence_id
+        JOIN ref_label_skills ls ON ls.label_id = l.id
+        JOIN ref_skills s ON s.id = ls.skill_id
+        WHERE d.code = ? ORDER BY l.rang, ls.rang''', (selected_domain,)).fetchall()
+    data_abc = {}
+    for label, comp, skill in rows:
+        data_abc.setdefault(label, (comp, []))[1].append(skill)
+
+    options = {col: [] for col in OPTION_COLUMNS + ['competence']}
+    for col, valeur in conn.execute('''SELECT o.categorie, o.valeur FROM ref_options o
+            JOIN ref_domaines d ON d.id = o.domaine_id
+            WHERE d.code = ? ORDER BY o.categorie, o.valeur''', (selected_domain,)):
+        options[col].append(valeur)
+
+    labels = {label: Activite(comp, tuple(skills)) for label, (comp, skills) in data_abc.items()}
+    return DomaineIndex(selected_domain, MappingProxyType(labels), tuple(options['competence']), tuple(options['prerequis']),
+                        tuple(options['materiel']), tuple(options['liens']))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _charger_index(version):
+    """Construit l'index de tous les domaines ; une seule fois par version du référentiel et par processus"""
+    with db.connexion() as conn:
+        index = MappingProxyType({dom: _lire_index(conn, dom) for dom in config.CSV_FILES})
+    # Les textes du référentiel sont convertis pour le PDF ici, une fois, et non à chaque cellule de chaque rendu
+    for dom_index in index.values():
+        texte.preparer([dom_index.domaine, *dom_index.competences, *dom_index.prerequis, *dom_index.materiel, *dom_index.liens])
+        for label, act in dom_index.labels.items():
+            texte.preparer([label, act.official_name, *act.skills])
+    return index
+
+def get_domain_index(selected_domain):
+    """Index du domaine pour la version courante du référentiel (simple lecture de dictionnaire)"""
+    return _charger_index(init_db())[selected_domain]
+
+def get_data_for_domain(selected_domain):
+    """Activité -> Activite(compétence officielle, savoir-faire) pour un domaine"""
+    return get_domain_index(selected_domain).labels
+
+def get_options_for_domain(selected_domain):
+    """Listes (pré-requis, matériel, liens matières) proposées pour un domaine"""
+    index = get_domain_index(selected_domain)
+    return index.prerequis, index.materiel, index.liens
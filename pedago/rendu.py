@@ -0,0 +1,180 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from pedago import config
+
+# --- CACHE DES PDF RENDUS (adressé par contenu) ---
+# La clé est un hash des entrées normalisées : deux reruns, deux clics ou deux collègues qui
+# génèrent la même fiche reçoivent les mêmes octets sans reconstruire le PDF.
+# À augmenter quand la mise en page change : les PDF déjà rendus (y compris sur disque) sont ignorés.
+VERSION_RENDU = 2
+# Champs sans effet sur le PDF (horodatage d'ajout d'un bloc)
+CHAMPS_IGNORES = {'id'}
+
+def _normaliser(valeur):
+    if isinstance(valeur, dict):
+        return {str(k): _normaliser(v) for k, v in valeur.items() if k not in CHAMPS_IGNORES}
+    if isinstance(valeur, (list, tuple)):
+        return [_normaliser(v) for v in valeur]
+    if hasattr(valeur, 'to_dict'):
+        # DataFrame (bilan) : contenu ligne par ligne
+        return _normaliser(valeur.to_dict('records'))
+    if valeur is None or isinstance(valeur, (str, int, float, bool)):
+        return valeur
+    return str(valeur)
+
+def empreinte_fichier(fichier):
+    """sha256 d'un fichier déposé (UploadedFile, BytesIO...), sans le recopier"""
+    if fichier is None:
+        return None
+    return hashlib.sha256(fichier.getbuffer()).hexdigest()
+
+def cle_rendu(genre, *entrees, annexe=None):
+    """Clé d'un PDF : type de fiche, entrées normalisées, version de la mise en page et empreinte de l'annexe"""
+    contenu = json.dumps([genre, VERSION_RENDU, _normaliser(entrees), annexe], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(contenu.encode('utf-8')).hexdigest()
+
+class CacheRendu:
+    """LRU en mémoire borné en octets ; les PDF évincés peuvent être déversés sur disque (dossier borné lui aussi)"""
+
+    def __init__(self, budget_octets, dossier=None, budget_disque=None):
+        self.budget = budget_octets
+        self.dossier = dossier
+        self.budget_disque = budget_disque or 4 * budget_octets
+        self._entrees = OrderedDict()
+        self._taille = 0
+        self._lock = threading.Lock()
+        self.succes = self.echecs = 0
+
+    def _chemin(self, cle):
+        return os.path.join(self.dossier, f"{cle}.pdf")
+
+    def get(self, cle):
+        with self._lock:
+            data = self._entrees.get(cle)
+            if data is not None:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return data
+        data = self._lire_disque(cle)
+        with self._lock:
+            if data is None:
+                self.echecs += 1
+                return None
+            self.succes += 1
+        self._ajouter(cle, data)
+        return data
+
+    def put(self, cle, data):
+        self._ajouter(cle, bytes(data))
+
+    def _ajouter(self, cle, data):
+        if len(data) > self.budget:
+            if self.dossier:
+                self._ecrire_disque(cle, data)
+            else:
+                print(f"Cache PDF : {len(data) / 1e6:.1f} Mo dépassent le budget ({self.budget / 1e6:.1f} Mo), PDF non mis en cache")
+            return
+        evinces = []
+        with self._lock:
+            ancien = self._entrees.pop(cle, None)
+            if ancien is not None:
+                self._taille -= len(ancien)
+            self._entrees[cle] = data
+            self._taille += len(data)
+            while self._taille > self.budget:
+                cle_evincee, data_evincee = self._entrees.popitem(last=False)
+                self._taille -= len(data_evincee)
+                evinces.append((cle_evincee, data_evincee))
+        # Écritures disque hors verrou
+        for cle_evincee, data_evincee in evinces:
+            self._ecrire_disque(cle_evincee, data_evincee)
+
+    def _lire_disque(self, cle):
+        if not self.dossier:
+            return None
+        try:
+            with open(self._chemin(cle), 'rb') as f:
+                data = f.read()
+            os.utime(self._chemin(cle))
+            return data
+        except OSError:
+            return None
+
+    def _ecrire_disque(self, cle, data):
+        if not self.dossier:
+            return
+        try:
+            os.makedirs(self.dossier, exist_ok=True)
+            tmp = f"{self._chemin(cle)}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, self._chemin(cle))
+            self._elaguer_disque()
+        except OSError as e:
+            print(f"Cache PDF : écriture disque impossible ({e})")
+
+    def _elaguer_disque(self):
+        """Supprime les PDF les moins récemment utilisés au-delà du budget disque"""
+        fichiers = []
+        for entree in os.scandir(self.dossier):
+            if entree.name.endswith('.pdf'):
+                st_res = entree.stat()
+                fichiers.append((st_res.st_mtime, st_res.st_size, entree.path))
+        total = sum(taille for _, taille, _ in fichiers)
+        for _, taille, path in sorted(fichiers):
+            if total <= self.budget_disque:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= taille
+
+    def vider(self):
+        with self._lock:
+            self._entrees.clear()
+            self._taille = 0
+
+    def stats(self):
+        with self._lock:
+            return {"entrees": len(self._entrees), "octets": self._taille, "succes": self.succes, "echecs": self.echecs}
+
+# Un seul cache par processus, partagé par toutes les sessions et les quatre pages PDF
+cache = CacheRendu(config.PDF_CACHE_OCTETS,
+                   dossier=os.path.join(config.CACHE_DIR, 'pdf') if config.PDF_CACHE_DISQUE else None)
+
+def obtenir(cle, construire):
+    """Octets du PDF pour cette clé : depuis le cache, sinon construire() puis mise en cache.
+
+    Une exception de construire() n'est pas mise en cache.
+    """
+    data = cache.get(cle)
+    if data is None:
+        data = construire()
+        cache.put(cle, data)
+    return data
+
+# --- DERNIER PDF GÉNÉRÉ PAR LA SESSION ---
+# Le cache partagé ne fait qu'accélérer : un PDF plus gros que son budget n'y entre pas et une autre
+# session peut l'évincer entre deux reruns. Le PDF généré reste donc dans la session (un par page).
+def obtenir_et_garder(session, nom, cle, construire):
+    """Comme obtenir(), puis le PDF est gardé dans session[nom] pour retrouver()"""
+    data = obtenir(cle, construire)
+    session[nom] = (cle, data)
+    return data
+
+def retrouver(session, nom, cle):
+    """PDF des entrées cle : celui gardé par la session, sinon le cache partagé (généré ailleurs), sinon None"""
+    garde = session.get(nom)
+    if garde is not None and garde[0] == cle:
+        return garde[1]
+    return cache.get(cle)
+
+def date_du_jour():
+    """Pour les PDF qui impriment la date du jour : la clé change à minuit"""
+    return datetime.date.today().isoformat()
@@ -0,0 +1,149 @@
+import csv
+import datetime
+import io
+from dataclasses import dataclass
+
+from pedago import db
+
+# --- RÉSULTATS DU QUIZ D'AUTO-ÉVALUATION ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS resultats_quiz (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, date_heure TEXT, nom TEXT, prenom TEXT,
+    classe TEXT, poste TEXT, score INTEGER, score_max INTEGER, pourcentage REAL, statut TEXT);
+-- Zone Professeur : pages triées par date (avec ou sans filtre classe / poste) et recherche par élève
+CREATE INDEX IF NOT EXISTS idx_resultats_date ON resultats_quiz (date_heure);
+CREATE INDEX IF NOT EXISTS idx_resultats_classe_date ON resultats_quiz (classe, date_heure);
+CREATE INDEX IF NOT EXISTS idx_resultats_poste_date ON resultats_quiz (poste, date_heure);
+CREATE INDEX IF NOT EXISTS idx_resultats_eleve ON resultats_quiz (nom, prenom);
+"""
+RESULT_COLUMNS = ['date_heure', 'nom', 'prenom', 'classe', 'Poste', 'Score', 'Max', 'Pourcentage', 'Statut']
+
+def init_results_db():
+    db.ensure_schema('resultats_quiz', SCHEMA)
+
+def save_results_frame(df):
+    """Enregistre un tableau « à plat » (une ligne par élève et par poste) en une seule transaction.
+
+    Colonnes attendues : nom, prenom, classe, Poste, Score, Max, Pourcentage, Statut (+ date_heure facultative).
+    """
+    init_results_db()
+    if df.empty:
+        return
+    df = df.copy()
+    if 'date_heure' not in df.columns:
+        df['date_heure'] = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    df = df[RESULT_COLUMNS].astype({'Score': int, 'Max': int, 'Pourcentage': float})
+    rows = list(df.astype(object).itertuples(index=False, name=None))
+    with db.transaction() as conn:
+        conn.executemany('''INSERT INTO resultats_quiz (date_heure, nom, prenom, classe, poste, score, score_max, pourcentage, statut)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+
+def save_class_results(submissions):
+    """Enregistre plusieurs copies (couples identite, df_resultats) d'un coup, par ex. une classe importée"""
+    date_now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    frames = [df_resultats.assign(date_heure=date_now, nom=identite['nom'], prenom=identite['prenom'], classe=identite['classe'])
+              for identite, df_resultats in submissions]
+    if frames:
+        import pandas as pd
+        save_results_frame(pd.concat(frames, ignore_index=True))
+
+def save_student_results(identite, df_resultats):
+    save_class_results([(identite, df_resultats)])
+
+# --- CONSULTATION (Zone Professeur) ---
+# Pagination par curseur (date_heure, id) : chaque page est une lecture d'index de TAILLE_PAGE lignes,
+# aussi rapide à la page 1 qu'après plusieurs années de résultats (pas d'OFFSET qui relit tout ce qui précède).
+COLONNES_CONSULTATION = ['id', 'date_heure', 'nom', 'prenom', 'classe', 'poste', 'score', 'score_max', 'pourcentage', 'statut']
+TAILLE_PAGE = 50
+# Au-delà, le compte affiché est « plus de COMPTE_MAX » : compter n'est jamais plus long que lire COMPTE_MAX lignes
+COMPTE_MAX = 10000
+# Exports (CSV, XLSX : voir pedago.exports) : lignes lues par paquets au curseur, jamais toute la table
+PAQUET_EXPORT = 5000
+
+@dataclass(frozen=True)
+class FiltresResultats:
+    """Filtres de la Zone Professeur ; None = pas de filtre. debut / fin : datetime.date, nom : début du nom"""
+    classe: str = None
+    poste: str = None
+    statut: str = None
+    debut: datetime.date = None
+    fin: datetime.date = None
+    nom: str = None
+
+    def clause(self):
+        """(conditions SQL, paramètres)"""
+        conditions, params = [], []
+        for colonne in ('classe', 'poste', 'statut'):
+            if getattr(self, colonne):
+                conditions.append(f'{colonne} = ?')
+                params.append(getattr(self, colonne))
+        if self.debut:
+            conditions.append('date_heure >= ?')
+            params.append(self.debut.isoformat())
+        if self.fin:
+            conditions.append('date_heure < ?')
+            params.append((self.fin + datetime.timedelta(days=1)).isoformat())
+        if self.nom:
+            # Intervalle plutôt que LIKE : l'index (nom, prenom) sert
+            conditions.append('nom >= ? AND nom < ?')
+            params += [self.nom, self.nom + '\uffff']
+        return conditions, params
+
+def _where(conditions):
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+def page_resultats(filtres, curseur=None, taille=TAILLE_PAGE):
+    """(lignes, curseur de la page suivante ou None) : les taille résultats plus anciens que curseur (date_heure, id)"""
+    init_results_db()
+    conditions, params = filtres.clause()
+    if curseur is not None:
+        conditions.append('(date_heure, id) < (?, ?)')
+        params += list(curseur)
+    with db.connexion() as conn:
+        lignes = conn.execute(f"SELECT {', '.join(COLONNES_CONSULTATION)} FROM resultats_quiz {_where(conditions)} "
+                              f"ORDER BY date_heure DESC, id DESC LIMIT ?", params + [taille + 1]).fetchall()
+    if len(lignes) <= taille:
+        return lignes, None
+    lignes = lignes[:taille]
+    return lignes, (lignes[-1][1], lignes[-1][0])
+
+def compter_resultats(filtres, maximum=COMPTE_MAX):
+    """Nombre de résultats filtrés, plafonné à maximum + 1"""
+    init_results_db()
+    conditions, params = filtres.clause()
+    with db.connexion() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM (SELECT 1 FROM resultats_quiz {_where(conditions)} LIMIT ?)',
+                            params + [maximum + 1]).fetchone()[0]
+
+def valeurs_filtres():
+    """(classes, postes) présents dans les résultats, lus sur les index"""
+    init_results_db()
+    with db.connexion() as conn:
+        classes = [c for c, in conn.execute('SELECT DISTINCT classe FROM resultats_quiz WHERE classe IS NOT NULL ORDER BY classe')]
+        postes = [p for p, in conn.execute('SELECT DISTINCT poste FROM resultats_quiz WHERE poste IS NOT NULL ORDER BY poste')]
+    return classes, postes
+
+def paquets_export(filtres, paquet=PAQUET_EXPORT):
+    """Toutes les lignes filtrées (colonnes COLONNES_CONSULTATION), dans l'ordre de la consultation, par paquets"""
+    init_results_db()
+    conditions, params = filtres.clause()
+    yield from db.par_paquets(f"SELECT {', '.join(COLONNES_CONSULTATION)} FROM resultats_quiz {_where(conditions)} "
+                              f"ORDER BY date_heure DESC, id DESC", params, paquet)
+
+def exporter_csv(filtres, paquet=PAQUET_EXPORT):
+    """Génère le CSV (octets UTF-8) paquet par paquet"""
+    tampon = io.StringIO()
+    writer = csv.writer(tampon, lineterminator='\n')
+    writer.writerow(COLONNES_CONSULTATION)
+    for lignes in paquets_export(filtres, paquet):
+        writer.writerows(lignes)
+        yield tampon.getvalue().encode('utf-8')
+        tampon.seek(0)
+        tampon.truncate()
+    if tampon.tell():
+        yield tampon.getvalue().encode('utf-8')
+
+def effacer_resultats():
+    init_results_db()
+    with db.transaction() as conn:
+        conn.execute('DELETE FROM resultats_quiz')
@@ -0,0 +1,99 @@
+import pandas as pd
+import streamlit as st
+
+from pedago import db, historique
+from pedago.historique import init_history_db
+
+# --- COUVERTURE DU RÉFÉRENTIEL (CALCULÉE CÔTÉ SQL) ---
+# Lecture du résumé 'couverture' (une ligne par classe et savoir-faire) et non des fiches brutes :
+# le coût dépend de la taille du référentiel, pas du nombre de fiches enregistrées.
+# Les jointures se font sur les identifiants du référentiel, jamais sur le texte des savoir-faire.
+
+def list_domaines():
+    """Domaines ayant au moins un savoir-faire actif"""
+    with db.connexion() as conn:
+        rows = conn.execute('''SELECT d.code FROM ref_domaines d
+            WHERE EXISTS (SELECT 1 FROM ref_skills s WHERE s.domaine_id = d.id AND s.actif = 1)
+            ORDER BY d.code''').fetchall()
+    return [r[0] for r in rows]
+
+def list_classes():
+    """Classes présentes dans l'historique (préfixe de la clé primaire du résumé)"""
+    init_history_db()
+    with db.connexion() as conn:
+        return [r[0] for r in conn.execute('SELECT DISTINCT classe FROM couverture ORDER BY classe')]
+
+def _requete_faits(domaine, classe):
+    where_cv = "WHERE cv.classe = ?" if classe is not None else ""
+    where_dom = "AND d.code = ?" if domaine else ""
+    params = ([classe] if classe is not None else []) + ([domaine] if domaine else [])
+    return f'''SELECT d.code AS domaine, c.libelle AS competence, s.libelle AS skill, f.nb AS "Nb Fois",
+            f.premiere AS "Première fois", f.derniere AS "Dernière fois"
+        FROM (SELECT cv.skill_id, SUM(cv.nb) AS nb, MIN(cv.premiere_date) AS premiere,
+                     MAX(cv.derniere_date) AS derniere
+              FROM couverture cv {where_cv} GROUP BY cv.skill_id) f
+        JOIN ref_skills s ON s.id = f.skill_id AND s.actif = 1
+        JOIN ref_domaines d ON d.id = s.domaine_id {where_dom}
+        JOIN ref_competences c ON c.id = s.competence_id
+        ORDER BY f.nb DESC, d.code, s.id''', params
+
+def _requete_manquants(domaine, classe):
+    where_dom = "AND d.code = ?" if domaine else ""
+    and_cv = "AND cv.classe = ?" if classe is not None else ""
+    params = ([domaine] if domaine else []) + ([classe] if classe is not None else [])
+    return f'''SELECT d.code AS domaine, c.libelle AS competence, s.libelle AS skill
+        FROM ref_skills s
+        JOIN ref_domaines d ON d.id = s.domaine_id
+        JOIN ref_competences c ON c.id = s.competence_id
+        WHERE s.actif = 1 {where_dom}
+          AND NOT EXISTS (SELECT 1 FROM couverture cv WHERE cv.skill_id = s.id {and_cv})
+        ORDER BY d.code, s.id''', params
+
+def skills_done(domaine=None, classe=None):
+    """Savoir-faire du référentiel déjà travaillés, avec leur nombre d'utilisations (tri décroissant)"""
+    init_history_db()
+    sql, params = _requete_faits(domaine, classe)
+    with db.connexion() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+def skills_missing(domaine=None, classe=None):
+    """Savoir-faire du référentiel jamais abordés (anti-jointure sur le résumé)"""
+    init_history_db()
+    sql, params = _requete_manquants(domaine, classe)
+    with db.connexion() as conn:
+        return pd.read_sql(sql, conn, params=params)
+
+# --- CACHE DE LA PAGE STATISTIQUES ---
+# Changer de filtre relit un résultat déjà calculé au lieu de réinterroger la base. Le jeton (version du
+# référentiel, compteur de l'historique) change à chaque fiche enregistrée, reconstruction du résumé ou
+# modification des CSV : les entrées périmées ne sont plus jamais demandées et sortent du cache.
+# PRAGMA data_version ne conviendrait pas : propre à chaque connexion du pool, il ignore ses propres écritures.
+
+def jeton(version_referentiel):
+    return version_referentiel, historique.version()
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _couverture(domaine, classe, jeton):
+    return skills_done(domaine, classe), skills_missing(domaine, classe)
+
+def couverture(domaine, classe, version_referentiel):
+    """(faits, jamais abordés) pour ces filtres, version_referentiel étant la valeur renvoyée par referentiel.init_db()"""
+    return _couverture(domaine, classe, jeton(version_referentiel))
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _graphique_frequences(domaine, classe, jeton):
+    import plotly.express as px # Chargé seulement quand le graphique est demandé
+    df_done = _couverture(domaine, classe, jeton)[0]
+    return px.bar(df_done.head(20), x='skill', y='Nb Fois', color='domaine', title="Top 20 des savoir-faire les plus utilisés")
+
+def graphique_frequences(domaine, classe, version_referentiel):
+    return _graphique_frequences(domaine, classe, jeton(version_referentiel))
+
+# --- EXPORT (mêmes requêtes, lues par paquets : voir pedago.exports) ---
+def paquets_faits(domaine=None, classe=None, paquet=5000):
+    init_history_db()
+    yield from db.par_paquets(*_requete_faits(domaine, classe), paquet)
+
+def paquets_manquants(domaine=None, classe=None, paquet=5000):
+    init_history_db()
+    yield from db.par_paquets(*_requete_manquants(domaine, classe), paquet)
@@ -0,0 +1,35 @@
+from functools import lru_cache
+
+# --- TEXTE PRÊT POUR LE PDF (police Arial de fpdf = latin-1) ---
+# Une seule table de traduction, compilée à l'import : un seul passage sur la chaîne au lieu d'un replace par caractère.
+TABLE_PDF = str.maketrans({
+    "’": "'", "‘": "'", "“": '"', "”": '"',
+    "–": "-", "…": "...", "œ": "oe", "€": "Eur", "•": "-"
+})
+
+# Textes du référentiel déjà convertis, remplis une fois par version (voir referentiel._charger_index)
+_prets = {}
+
+def _convertir(text):
+    text = text.translate(TABLE_PDF)
+    if text.isascii():
+        return text
+    return text.encode('latin-1', 'replace').decode('latin-1')
+
+@lru_cache(maxsize=16384)
+def _convertir_memo(text):
+    return _convertir(text)
+
+def preparer(textes):
+    """Convertit d'avance les textes du référentiel (compétences, activités, savoir-faire, options)"""
+    _prets.update((text, _convertir(text)) for text in textes if isinstance(text, str) and text not in _prets)
+
+def clean_text(text):
+    """Texte affichable par fpdf : guillemets et tirets typographiques remplacés, reste hors latin-1 -> '?'"""
+    if not isinstance(text, str):
+        return str(text) if text is not None else ""
+    pret = _prets.get(text)
+    if pret is not None:
+        return pret
+    # Textes saisis (titres, consignes...) : mémorisés, un rerun ou une régénération ne les reconvertit pas
+    return _convertir_memo(text)
@@ -0,0 +1,81 @@
+import csv
+import sqlite3
+
+import pytest
+
+from pedago import config, db, historique, referentiel, statistiques
+
+# Cellules comme dans les vrais CSV : tabulation dans la compétence, retour à la ligne en fin de savoir-faire
+COMPETENCE = "C10\tDéfinir le dispositif de prise de vues"
+SKILL_TABULE = "SF2.14:\tRégler la caméra."
+SKILL_LIGNE = "SF2.15: Étalonner la chaîne image (moniteur référence).\n"
+
+@pytest.fixture
+def dossier(tmp_path, monkeypatch):
+    """Référentiel IMAGE de deux savoir-faire et ancienne table 'historique' remplie avec le texte brut des cellules"""
+    monkeypatch.setattr(config, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "DB_FILE_PATH", str(tmp_path / "pedago.db"))
+    monkeypatch.setattr(config, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(config, "CSV_FILES", {"IMAGE": "Image.csv"})
+    monkeypatch.setattr(referentiel, "_signature_connue", None)
+    with open(tmp_path / "Image.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(referentiel.REQUIRED_COLUMNS)
+        writer.writerow([COMPETENCE, SKILL_TABULE, "Prise de vues", "", "", ""])
+        writer.writerow([COMPETENCE, SKILL_LIGNE, "Prise de vues", "", "", ""])
+    with sqlite3.connect(tmp_path / "pedago.db") as conn:
+        conn.execute('CREATE TABLE historique (id INTEGER PRIMARY KEY, date TEXT, classe TEXT, domaine TEXT, competence TEXT, skill TEXT)')
+        conn.executemany('INSERT INTO historique (date, classe, domaine, competence, skill) VALUES (?, ?, ?, ?, ?)', [
+            ("2024-01-15", "1TSI", "IMAGE", COMPETENCE, SKILL_TABULE),
+            ("2024-01-15", "1TSI", "IMAGE", COMPETENCE, SKILL_LIGNE),
+        ])
+    conn.close()
+    yield tmp_path
+    pool = db._pools.pop(config.DB_FILE_PATH, None)
+    while pool is not None and not pool.empty():
+        pool.get_nowait().close()
+
+def test_migration_retrouve_les_cellules_normalisees(dossier):
+    referentiel.init_db()
+    historique.init_history_db()
+    with db.connexion() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM ref_skills WHERE actif = 0').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM fiche_skills').fetchone()[0] == 2
+    faits = statistiques.skills_done(classe="1TSI")
+    assert sorted(faits['skill']) == sorted(referentiel.normaliser(s) for s in (SKILL_TABULE, SKILL_LIGNE))
+    assert statistiques.skills_missing(classe="1TSI").empty
+
+def test_fiche_enregistree_avec_le_texte_brut(dossier):
+    referentiel.init_db()
+    info = {"date": "2024-02-01", "classe": "1TSI", "title": "TP caméra", "doc_id": "TP1"}
+    blocks = [{"domain": "IMAGE", "competence": COMPETENCE, "label": "Prise de vues", "skills": [SKILL_TABULE, SKILL_LIGNE]}]
+    assert historique.save_session_to_history(info, blocks)
+    with db.connexion() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM ref_skills WHERE actif = 0').fetchone()[0] == 0
+    assert len(statistiques.skills_done(classe="1TSI")) == 2
+
+def test_libelle_enregistre_avant_normalisation(dossier):
+    """Référentiel écrit par l'ancienne lecture (texte brut des cellules) : retrouvé sans ligne inactive"""
+    referentiel.init_db()
+    with db.transaction() as conn:
+        conn.execute('UPDATE ref_skills SET libelle = ? WHERE libelle = ?', (SKILL_LIGNE, referentiel.normaliser(SKILL_LIGNE)))
+    historique.init_history_db()
+    with db.connexion() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM ref_skills WHERE actif = 0').fetchone()[0] == 0
+        assert conn.execute('SELECT COUNT(*) FROM fiche_skills').fetchone()[0] == 2
+
+def test_savoir_faire_absent_signale(dossier, capsys):
+    with sqlite3.connect(dossier / "pedago.db") as conn:
+        conn.executemany('INSERT INTO historique (date, classe, domaine, competence, skill) VALUES (?, ?, ?, ?, ?)', [
+            # Domaine manquant : retrouvé dans IMAGE
+            ("2024-01-20", "1TSI", None, COMPETENCE, SKILL_TABULE),
+            ("2024-01-20", "1TSI", "IMAGE", COMPETENCE, "SF9.99: Savoir-faire retiré du CSV."),
+        ])
+    conn.close()
+    referentiel.init_db()
+    historique.init_history_db()
+    with db.connexion() as conn:
+        inactifs = conn.execute('SELECT libelle FROM ref_skills WHERE actif = 0').fetchall()
+        assert inactifs == [("SF9.99: Savoir-faire retiré du CSV.",)]
+        assert conn.execute('SELECT COUNT(*) FROM fiche_skills').fetchone()[0] == 4
+    assert "1 savoir-faire introuvable" in capsys.readouterr().out